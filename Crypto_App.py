@@ -164,6 +164,9 @@ def display_crypto_app(Binance,Pnl_calculation,git):
     price_output=widgets.Output()
 
     def get_price_threading(tickers,start_date):
+
+        if Binance.price_store is not None:
+            return Binance.get_price_threading(tickers,start_date)
             
         today = datetime.date.today()
         days_total = (today - start_date).days
@@ -958,7 +961,7 @@ def display_crypto_app(Binance,Pnl_calculation,git):
         current_quantities['asset']=current_quantities['asset']+'USDT'
         current_quantities=current_quantities.set_index('asset')
         
-        current_positions=Binance.get_inventory().round(4)
+        current_positions=Binance.get_inventory(quantities_api).round(4)
         current_positions.columns=['Current Portfolio in USDT','Current Weights']
         amount=current_positions.loc['Total']['Current Portfolio in USDT']
         condition=current_positions.index!='Total'
@@ -987,7 +990,7 @@ def display_crypto_app(Binance,Pnl_calculation,git):
                 print("⚠️ Load Model.")
         
             else:
-                last_prices = Binance.get_price(list(quantities.iloc[-1].keys()))
+                last_prices = Binance.get_price_snapshot().reindex(quantities.columns).to_frame().T
                 positions = pd.DataFrame(quantities.iloc[-1] * last_prices).T
         
                 amount_ex_out_of_positions = (
@@ -2177,9 +2180,7 @@ def display_crypto_app(Binance,Pnl_calculation,git):
         market_pnl=market_portfolio-rebalanced_book_cost(range_prices,quantities_eigen.loc[range_prices.index])
         market_pnl['Market Index']=market_pnl.sum(axis=1)
     
-        vol_contribution=get_ex_ante_vol_contribution(weights_series,range_returns,window=market_vol_window.value)
-        correlation_contribution=get_correlation_contribution(weights_series,range_returns,window=market_vol_window.value)
-        idiosyncratic_contribution=get_idiosyncratic_contribution(weights_series,range_returns,window=market_vol_window.value)
+        vol_contribution,idiosyncratic_contribution,correlation_contribution,_=get_vol_decomposition(weights_series,range_returns,window=market_vol_window.value)
             
         output1=widgets.Output()
         output2=widgets.Output()
@@ -2571,14 +2572,14 @@ def display_crypto_app(Binance,Pnl_calculation,git):
             with git_output:
                 git_output.clear_output(wait=True)
                 
-                quantities_holding.to_excel('Quantities.xlsx',index=True)
-                positions.to_excel('Positions.xlsx',index=True)
+                files={'Positions':positions,'Quantities':quantities_holding}
+
                 if not trades.empty:
-                    trades.to_excel('Trade History Reconstructed.xlsx',index=True)
-                    git.push_or_update_file(trades,'Trade History Reconstructed')
+                    files['Trade History Reconstructed']=trades
 
-                git.push_or_update_file(positions,'Positions')
-                git.push_or_update_file(quantities_holding,'Quantities')
+                # Saved and pushed in the background, repeated clicks are coalesced into one commit
+                git.enqueue_frames(files,message='Update positions, quantities and trades via API',save_local=True)
+                print('Upload queued')
                     
 
         push_button=widgets.Button(description='Upload Files',button_style='success')
@@ -2833,15 +2834,11 @@ def display_crypto_app(Binance,Pnl_calculation,git):
                 
                 series_weights=series_dict[selected_fund_to_decompose.value]
                 if selected_fund_to_decompose.value!='Historical Portfolio':
-                    contribution_to_vol=get_ex_ante_vol_contribution(series_weights.loc[start_ts:end_ts],returns_to_use.loc[start_ts:end_ts],window_risk.value)
-                    correlation_contrib=get_correlation_contribution(series_weights.loc[start_ts:end_ts],returns_to_use.loc[start_ts:end_ts],window_risk.value)
-                    idiosyncratic_contrib=get_idiosyncratic_contribution(series_weights.loc[start_ts:end_ts],returns_to_use.loc[start_ts:end_ts],window_risk.value)
+                    contribution_to_vol,idiosyncratic_contrib,correlation_contrib,_=get_vol_decomposition(series_weights.loc[start_ts:end_ts],returns_to_use.loc[start_ts:end_ts],window_risk.value)
 
                 else:
                     
-                    contribution_to_vol=get_ex_ante_vol_contribution(series_weights.loc[start_ts:end_ts],current_underlying_returns.loc[series_weights.index].loc[start_ts:end_ts],window_risk.value)
-                    correlation_contrib=get_correlation_contribution(series_weights.loc[start_ts:end_ts],current_underlying_returns.loc[series_weights.index].loc[start_ts:end_ts],window_risk.value)
-                    idiosyncratic_contrib=get_idiosyncratic_contribution(series_weights.loc[start_ts:end_ts],current_underlying_returns.loc[series_weights.index].loc[start_ts:end_ts],window_risk.value)
+                    contribution_to_vol,idiosyncratic_contrib,correlation_contrib,_=get_vol_decomposition(series_weights.loc[start_ts:end_ts],current_underlying_returns.loc[series_weights.index].loc[start_ts:end_ts],window_risk.value)
                     
                 with output1:
                     
@@ -2946,20 +2943,20 @@ def display_crypto_app(Binance,Pnl_calculation,git):
         current_underlying_prices=get_price_threading(tickers_combined,weights_ex_post.index[0].date())    
         current_underlying_returns=current_underlying_prices.pct_change(fill_method=None)
 
-        tasks=[(key,series_dict[key],returns_to_use.loc[start_ts:end_ts],window_risk.value) for key in series_dict]
+        weights_paths=dict(series_dict)
 
         series_dict['Historical Portfolio']=weights_ex_post.loc[start_ts:end_ts]
 
-        tasks.append(('Historical Portfolio',weights_ex_post.loc[start_ts:end_ts],current_underlying_returns.loc[weights_ex_post.index].loc[start_ts:end_ts],window_risk.value))
-
         loading_bar_risk.value = 0
-        loading_bar_risk.max=len(tasks)   
+        loading_bar_risk.max=2
         
-        results_dict = {}
+        # Every allocation shares the same returns, their window covariances are computed once
+        batch_vol,_=get_ex_ante_vol_batch(weights_paths,returns_to_use.loc[start_ts:end_ts],window_risk.value)
+        results_dict={name:batch_vol[[name]] for name in batch_vol.columns}
+        loading_bar_risk.value += 1
         
-        for name,weight,returns,window in tasks:
-            results_dict[name]=get_ex_ante_vol(weight, returns, window)
-            loading_bar_risk.value += 1
+        results_dict['Historical Portfolio']=get_ex_ante_vol(weights_ex_post.loc[start_ts:end_ts],current_underlying_returns.loc[weights_ex_post.index].loc[start_ts:end_ts],window_risk.value)
+        loading_bar_risk.value += 1
                 
         loading_bar_risk.value = loading_bar_risk.max
         
@@ -3028,15 +3025,11 @@ def display_crypto_app(Binance,Pnl_calculation,git):
                 series_weights=spread_weights[selected_fund_to_decompose.value]
                 
                 if selected_fund_to_decompose.value!='Historical Portfolio':
-                    contribution_to_vol=get_ex_ante_vol_contribution(series_weights.loc[start_ts:end_ts],returns_to_use.loc[series_weights.index].loc[start_ts:end_ts],window_te.value)
-                    correlation_contrib=get_correlation_contribution(series_weights.loc[start_ts:end_ts],returns_to_use.loc[series_weights.index].loc[start_ts:end_ts],window_te.value)
-                    idiosyncratic_contrib=get_idiosyncratic_contribution(series_weights.loc[start_ts:end_ts],returns_to_use.loc[series_weights.index].loc[start_ts:end_ts],window_te.value)
+                    contribution_to_vol,idiosyncratic_contrib,correlation_contrib,_=get_vol_decomposition(series_weights.loc[start_ts:end_ts],returns_to_use.loc[series_weights.index].loc[start_ts:end_ts],window_te.value)
 
                 else:
                     
-                    contribution_to_vol=get_ex_ante_vol_contribution(series_weights.loc[start_ts:end_ts],current_underlying_returns.loc[series_weights.index].loc[start_ts:end_ts],window_te.value)
-                    correlation_contrib=get_correlation_contribution(series_weights.loc[start_ts:end_ts],current_underlying_returns.loc[series_weights.index].loc[start_ts:end_ts],window_te.value)
-                    idiosyncratic_contrib=get_idiosyncratic_contribution(series_weights.loc[start_ts:end_ts],current_underlying_returns.loc[series_weights.index].loc[start_ts:end_ts],window_te.value)
+                    contribution_to_vol,idiosyncratic_contrib,correlation_contrib,_=get_vol_decomposition(series_weights.loc[start_ts:end_ts],current_underlying_returns.loc[series_weights.index].loc[start_ts:end_ts],window_te.value)
                     
                 with output1:
                     
@@ -3160,21 +3153,30 @@ def display_crypto_app(Binance,Pnl_calculation,git):
         for key in series_dict:
             spread_weights[key]=(series_dict[key]-selected_weights).fillna(0)
         
-        tasks=[(key,spread_weights[key].loc[start_ts:end_ts],returns_to_use.loc[spread_weights[key].loc[start_ts:end_ts].index],window_te.value) for key in series_dict if key!='Historical Portfolio']
+        # Spreads on the same dates share one rolling covariance
+        spread_groups={}
+        for key in series_dict:
+            if key!='Historical Portfolio':
+                spread=spread_weights[key].loc[start_ts:end_ts]
+                spread_groups.setdefault(tuple(spread.index),{})[key]=spread
         
         spread_ex_post=(weights_ex_post-selected_weights).loc[weights_ex_post.index].loc[start_ts:end_ts].fillna(0)
         spread_weights['Historical Portfolio']=spread_ex_post
-        tasks.append(('Historical Portfolio',spread_ex_post,current_underlying_returns.loc[spread_ex_post.index].loc[start_ts:end_ts],window_te.value))
 
         loading_bar_risk.value = 0
-        loading_bar_risk.max=len(tasks)   
+        loading_bar_risk.max=len(spread_groups)+1
         
         results_dict = {}
 
-        for name,weight,returns,window in tasks:
+        for dates,paths in spread_groups.items():
             
-            results_dict[name]=get_ex_ante_vol(weight, returns, window)
+            batch_te,_=get_ex_ante_vol_batch(paths,returns_to_use.loc[list(dates)],window_te.value)
+            results_dict.update({name:batch_te[[name]] for name in batch_te.columns})
             loading_bar_risk.value += 1
+        
+        results_dict={key:results_dict[key] for key in series_dict if key in results_dict}
+        results_dict['Historical Portfolio']=get_ex_ante_vol(spread_ex_post,current_underlying_returns.loc[spread_ex_post.index].loc[start_ts:end_ts],window_te.value)
+        loading_bar_risk.value += 1
             
         loading_bar_risk.value = loading_bar_risk.max
         
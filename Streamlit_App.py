@@ -23,6 +23,11 @@ import plotly.graph_objects as go
 
 from src import GitHub
 from src import BinanceAPI
+from src import PriceStore
+from src import MinuteBarStore
+from src import SnapshotStore
+from src.Snapshot_Store import import_excel, account_root, DEFAULT_SOURCES
+from src.Excel_Cache import excel_cache
 from src.RiskMetrics import *
 from src import PnL
 from src import get_close
@@ -74,7 +79,7 @@ def get_positions():
     current_quantities['asset']=current_quantities['asset']+'USDT'
     current_quantities=current_quantities.set_index('asset')
     
-    current_positions=Binance.get_inventory().round(4)
+    current_positions=Binance.get_inventory(quantities_api).round(4)
     current_positions.columns=['Current Portfolio in USDT','Current Weights']
     amount=current_positions.loc['Total']['Current Portfolio in USDT']
     condition=current_positions.index!='Total'
@@ -104,12 +109,18 @@ def get_positions():
 def get_pnl(url):
     
     # url='https://github.com/niroojane/Risk-Management/raw/refs/heads/main/Trade%20History%20Reconstructed.xlsx'
-    trade_history = read_excel_from_url(url)
+    # The workbook at url is imported into the store by sync_snapshot_store (sidebar)
+
+    trade_history = snapshot_store.read_trades()
     
-    if trade_history is None:
+    if trade_history.empty:
         raise FileNotFoundError("Trade history could not be loaded. Execution stopped.")  
         
+    pending=trade_history['Pair Quantity'].isna()
     trades=Pnl_calculation.get_trade_in_usdt(trade_history)
+
+    # Trades priced for the first time are kept, so they are not priced again on the next run
+    snapshot_store.append_trades(trades.loc[pending & trades['Pair Quantity'].notna()])
     book_cost=Pnl_calculation.get_book_cost(trades)
     realized_pnl,profit_and_loss=Pnl_calculation.get_pnl(book_cost,trades)
     book_cost['MANTRAUSDT']=book_cost['OMUSDT']/4
@@ -121,44 +132,50 @@ def get_pnl(url):
 
     get_positions()
 
+def sync_snapshot_store(urls):
+
+    # Imports every workbook whose content changed since it was last imported (a new
+    # URL, or a newer file pushed to it) and returns the datasets imported
+
+    imported=[]
+    sources=snapshot_store.sources()
+
+    for dataset,url in urls.items():
+
+        # Revalidated with the ETag of the cached copy, parsed only when the file changed
+        frame = read_excel_from_url(url) if dataset=='trades' else read_excel_from_url(url,index_col=0)
+
+        if frame is None:
+            raise FileNotFoundError(f"{dataset.capitalize()} could not be loaded. Execution stopped.")
+
+        version=excel_cache.version(url)
+
+        if sources.get(dataset)=={'url':url,'version':version}:
+            continue
+
+        import_excel(snapshot_store,dataset,frame)
+        snapshot_store.set_source(dataset,url,version)
+        imported.append(dataset)
+
+    return imported
+
 def check_connection(url_positions,url_quantities,url_trades):
     
     # url_positions='https://github.com/niroojane/Risk-Management/raw/refs/heads/main/Positions.xlsx'
     # url_quantities='https://github.com/niroojane/Risk-Management/raw/refs/heads/main/Quantities.xlsx'
     
-    position = read_excel_from_url(url_positions,index_col=0)
-    if position is None:
-        raise FileNotFoundError("Positions.xlsx could not be loaded. Execution stopped.")
-        print('Positions Not Found in Repository')
-        
-    quantities_history = read_excel_from_url(url_quantities,index_col=0)
-    if quantities_history is None:
-        raise FileNotFoundError("Quantities.xlsx could not be loaded. Execution stopped.")
-        print('Quantities Not Found in Repository')
-    
-    trade_history = read_excel_from_url(url_trades,index_col=0)
-    
-    if trade_history is None:
-        raise FileNotFoundError("Trade history could not be loaded. Execution stopped.")  
-        print('Trades Not Found in Repository')
-
-    # position=pd.read_excel('Positions.xlsx',index_col=0)
     positions,quantities_holding=Binance.get_positions_history(enddate=datetime.datetime.today())
-    positions=positions.sort_index()
-    positions.index=pd.to_datetime(positions.index)
-    positions=pd.concat([position,positions])
     positions.index=pd.to_datetime(positions.index)
-    positions=pd.concat([position,positions]).sort_index()
-    positions=positions.loc[~positions.index.duplicated(keep='last'),:]
-    positions['Total']=positions.loc[:,positions.columns!='Total'].sum(axis=1)
-    
-    # quantities_history=pd.read_excel('Quantities.xlsx',index_col=0)
-    
     quantities_holding.index=pd.to_datetime(quantities_holding.index)
-    quantities_holding=pd.concat([quantities_holding,quantities_history])
-    quantities_holding=quantities_holding.loc[~quantities_holding.index.duplicated(),:]
 
-    quantities_holding=quantities_holding.sort_index()
+    # The days returned by the API replace the stored ones
+    snapshot_store.append('positions',positions)
+    snapshot_store.append('quantities',quantities_holding)
+
+    positions=snapshot_store.read('positions')
+    positions['Total']=positions.loc[:,positions.columns!='Total'].sum(axis=1)
+    
+    quantities_holding=snapshot_store.read('quantities')
 
     st.session_state.quantities_holding=quantities_holding
     st.session_state.positions=positions
@@ -219,6 +236,7 @@ main_tabs=st.tabs(["Investment Universe","Strategy","Current Portfolio","Risk An
 Binance = None
 Pnl_calculation = None
 git = None    
+snapshot_store = None
 
 with st.sidebar:
     
@@ -226,37 +244,31 @@ with st.sidebar:
 
     st.subheader('P&L URL')
     
-    trades_url=st.text_input(label='Trades URL',value='https://github.com/niroojane/Risk-Management/raw/refs/heads/main/Trade%20History%20Reconstructed.xlsx')
-    position_url=st.text_input(label='Position URL',value='https://github.com/niroojane/Risk-Management/raw/refs/heads/main/Positions.xlsx')
-    quantities_url=st.text_input(label='Quantities URL',value='https://github.com/niroojane/Risk-Management/raw/refs/heads/main/Quantities.xlsx')
+    trades_url=st.text_input(label='Trades URL',value=DEFAULT_SOURCES['trades'])
+    position_url=st.text_input(label='Position URL',value=DEFAULT_SOURCES['positions'])
+    quantities_url=st.text_input(label='Quantities URL',value=DEFAULT_SOURCES['quantities'])
     files_status = st.empty() 
-
-    try:
-        position = read_excel_from_url(position_url,index_col=0)
-        if position is None:
-            raise FileNotFoundError("Positions.xlsx could not be loaded. Execution stopped.")
-            print('Positions Not Found in Repository')
-            
-        quantities_history = read_excel_from_url(quantities_url,index_col=0)
-        if quantities_history is None:
-            raise FileNotFoundError("Quantities.xlsx could not be loaded. Execution stopped.")
-            print('Quantities Not Found in Repository')
-            
-        trade_history = read_excel_from_url(trades_url)
-        if trade_history is None:
-            raise FileNotFoundError("Trade history could not be loaded. Execution stopped.")  
-            print('Trades Not Found in Repository')
-        files_status.success('Files Retrieved')
-
-    except Exception as e:
-        files_status.error(f"❌ Files were not retrieved: {e}")
-    
     
     st.subheader('Binance Keys')
     
     binance_streamlit_api=st.text_input(label='Binance API Key',value=binance_api_key)
     binance_streamlit_secret=st.text_input(label='Binance Secret Key',value=binance_api_secret)
     binance_status = st.empty()     
+
+    # One store per account and set of workbooks, sessions of other accounts never share it
+    source_urls={'positions':position_url,'quantities':quantities_url,'trades':trades_url}
+    snapshot_store = SnapshotStore(account_root(binance_streamlit_api,source_urls))
+
+    try:
+        imported=sync_snapshot_store(source_urls)
+        
+        if imported:
+            files_status.success(f"Files Retrieved: {', '.join(imported)}")
+        else:
+            files_status.success('Files up to date')
+
+    except Exception as e:
+        files_status.error(f"❌ Files were not retrieved: {e}")
     
     st.subheader('Github Keys')
     
@@ -270,12 +282,14 @@ with st.sidebar:
     try:
         Binance = BinanceAPI(
             binance_streamlit_api,
-            binance_streamlit_secret
+            binance_streamlit_secret,
+            price_store=PriceStore()
         )
         
         Pnl_calculation = PnL(
             binance_streamlit_api,
-            binance_streamlit_secret
+            binance_streamlit_secret,
+            minute_store=MinuteBarStore()
         )
 
 
@@ -1112,19 +1126,15 @@ with main_tabs[3]:
                         current_underlying_prices=Binance.get_price_threading(tickers_combined,start_date)
                         current_underlying_returns=current_underlying_prices.pct_change(fill_method=None)
                         
-                        tasks=[(key,series_dict[key],range_returns,window_risk) for key in series_dict if key!='Historical Portfolio']
+                        # Every allocation shares range_returns, their window covariances are computed once
+                        weights_paths={key:series_dict[key] for key in series_dict if key!='Historical Portfolio'}
+                        results_vol,_=get_ex_ante_vol_batch(weights_paths,range_returns,window_risk)
                         
                         mask = (weights_ex_post.index >= selmind) & (weights_ex_post.index <= selmaxd)
     
-                        tasks.append(('Historical Portfolio',weights_ex_post.loc[mask],current_underlying_returns.loc[weights_ex_post.index].loc[mask],window_risk))
-                                
-                        results_dict = {}
-
-                        for name,weight,returns,window in tasks:
-                            results_dict[name]=get_ex_ante_vol(weight, returns, window_risk)
+                        historical_vol=get_ex_ante_vol(weights_ex_post.loc[mask],current_underlying_returns.loc[weights_ex_post.index].loc[mask],window_risk)
                                             
-                        results_vol=pd.concat(results_dict.values(), axis=1)
-                        results_vol.columns=results_dict.keys()
+                        results_vol=pd.concat([results_vol,historical_vol.set_axis(['Historical Portfolio'],axis=1)], axis=1)
                         
                         st.session_state.results_vol= results_vol
                         st.session_state.current_underlying_returns=current_underlying_returns
@@ -1139,15 +1149,11 @@ with main_tabs[3]:
     
                     if selected_fund_to_decompose!='Historical Portfolio':
                         
-                        contribution_to_vol=get_ex_ante_vol_contribution(series_weights,range_returns.loc[series_weights.index],window_risk)
-                        correlation_contrib=get_correlation_contribution(series_weights,range_returns.loc[series_weights.index],window_risk)
-                        idiosyncratic_contrib=get_idiosyncratic_contribution(series_weights,range_returns.loc[series_weights.index],window_risk)
+                        contribution_to_vol,idiosyncratic_contrib,correlation_contrib,_=get_vol_decomposition(series_weights,range_returns.loc[series_weights.index],window_risk)
         
                     else:
                         
-                        contribution_to_vol=get_ex_ante_vol_contribution(series_weights.loc[mask],current_underlying_returns.loc[series_weights.index].loc[mask],window_risk)
-                        correlation_contrib=get_correlation_contribution(series_weights.loc[mask],current_underlying_returns.loc[series_weights.index].loc[mask],window_risk)
-                        idiosyncratic_contrib=get_idiosyncratic_contribution(series_weights.loc[mask],current_underlying_returns.loc[series_weights.index].loc[mask],window_risk)
+                        contribution_to_vol,idiosyncratic_contrib,correlation_contrib,_=get_vol_decomposition(series_weights.loc[mask],current_underlying_returns.loc[series_weights.index].loc[mask],window_risk)
                     
                     col1, col2 = st.columns([1, 1])
         
@@ -1296,20 +1302,21 @@ with main_tabs[3]:
                         current_underlying_prices=Binance.get_price_threading(tickers_combined,start_date)
                         current_underlying_returns=current_underlying_prices.pct_change(fill_method=None)
                         
-                        tasks=[(key,spread_weights[key],range_returns.loc[spread_weights[key].index],window_te) for key in series_dict if key!='Historical Portfolio']
+                        # Spreads on the same dates share one rolling covariance
+                        spread_groups={}
+                        for key in series_dict:
+                            if key!='Historical Portfolio':
+                                spread_groups.setdefault(tuple(spread_weights[key].index),{})[key]=spread_weights[key]
+                        
+                        results_list=[get_ex_ante_vol_batch(paths,range_returns.loc[list(dates)],window_te)[0] for dates,paths in spread_groups.items()]
                         
                         mask = (current_underlying_returns.index >= selmind) & (current_underlying_returns.index <= selmaxd)
     
-                        tasks.append(('Historical Portfolio',spread_ex_post,current_underlying_returns.loc[spread_ex_post.index],window_te))
-                                
-                        results_dict = {}
-                        
-                        for name,weight,returns,window in tasks:
-            
-                            results_dict[name]=get_ex_ante_vol(weight, returns, window_te)
+                        historical_te=get_ex_ante_vol(spread_ex_post,current_underlying_returns.loc[spread_ex_post.index],window_te)
+                        results_list.append(historical_te.set_axis(['Historical Portfolio'],axis=1))
                                             
-                        results_tracking_error=pd.concat(results_dict.values(), axis=1)
-                        results_tracking_error.columns=results_dict.keys()
+                        results_tracking_error=pd.concat(results_list, axis=1)
+                        results_tracking_error=results_tracking_error[[key for key in series_dict if key!='Historical Portfolio']+['Historical Portfolio']]
                         
                         st.session_state.results_tracking_error= results_tracking_error
                         st.session_state.current_underlying_returns_te=current_underlying_returns
@@ -1324,15 +1331,11 @@ with main_tabs[3]:
         
                     if selected_fund_to_decompose!='Historical Portfolio':
         
-                        contribution_to_vol=get_ex_ante_vol_contribution(series_weights,range_returns.loc[series_weights.index],window_te)
-                        correlation_contrib=get_correlation_contribution(series_weights,range_returns.loc[series_weights.index],window_te)
-                        idiosyncratic_contrib=get_idiosyncratic_contribution(series_weights,range_returns.loc[series_weights.index],window_te)
+                        contribution_to_vol,idiosyncratic_contrib,correlation_contrib,_=get_vol_decomposition(series_weights,range_returns.loc[series_weights.index],window_te)
         
                     else:
                         
-                        contribution_to_vol=get_ex_ante_vol_contribution(series_weights.loc[mask],current_underlying_returns.loc[series_weights.index].loc[mask],window_te)
-                        correlation_contrib=get_correlation_contribution(series_weights.loc[mask],current_underlying_returns.loc[series_weights.index].loc[mask],window_te)
-                        idiosyncratic_contrib=get_idiosyncratic_contribution(series_weights.loc[mask],current_underlying_returns.loc[series_weights.index].loc[mask],window_te)
+                        contribution_to_vol,idiosyncratic_contrib,correlation_contrib,_=get_vol_decomposition(series_weights.loc[mask],current_underlying_returns.loc[series_weights.index].loc[mask],window_te)
                     
                     col1, col2 = st.columns([1, 1])
         
@@ -2113,9 +2116,7 @@ with main_tabs[4]:
                 market_index=market_index.pct_change(fill_method=None)
                 market_index.columns=['Market Index']
                 
-                vol_contribution=get_ex_ante_vol_contribution(weights_series,range_returns,window=window_vol_market)
-                correlation_contribution=get_correlation_contribution(weights_series,range_returns,window=window_vol_market)
-                idiosyncratic_contribution=get_idiosyncratic_contribution(weights_series,range_returns,window=window_vol_market)
+                vol_contribution,idiosyncratic_contribution,correlation_contribution,_=get_vol_decomposition(weights_series,range_returns,window=window_vol_market)
                 col1, col2 = st.columns([1, 1])
                 
                 perf_index_eigen=pd.DataFrame()
@@ -2247,7 +2248,7 @@ with main_tabs[2]:
 
                 res=st.session_state.results
                 quantities=res['quantities']
-                last_prices = Binance.get_price(list(quantities.iloc[-1].keys()))
+                last_prices = Binance.get_price_snapshot().reindex(quantities.columns).to_frame().T
                 positions = pd.DataFrame(quantities.iloc[-1] * last_prices).T
         
                 amount_ex_out_of_positions = (
@@ -2589,19 +2590,23 @@ with main_tabs[2]:
                 push_button=st.button('Upload Files')
 
                 if push_button:
-                    quantities_holding.to_excel('Quantities.xlsx',index=True)
-                    positions.to_excel('Positions.xlsx',index=True)
-                    trades.to_excel('Trade History Reconstructed.xlsx',index=True)
-
-                    git.push_or_update_file(positions,'Positions')
-                    st.success('Positions Updated',icon="✅")   
+                    files={'Positions':positions,'Quantities':quantities_holding}
                     
                     if 'trades' in st.session_state:
-                        git.push_or_update_file(trades,'Trade History Reconstructed')
-                        st.success('Trades Updated',icon="✅")
+                        files['Trade History Reconstructed']=trades
+
+                    # Saved and pushed in the background, repeated clicks are coalesced into one commit
+                    git.enqueue_frames(files,message='Update positions, quantities and trades via API',save_local=True)
+                    st.info('Upload queued')
+
+                publish_status=git.publish_status()
 
-                    git.push_or_update_file(quantities_holding,'Quantities')
-                    st.success('Quantities Updated',icon="✅")
+                if publish_status['state'] in ('pending','publishing','retrying'):
+                    st.caption(f"Upload {publish_status['state']}: {', '.join(publish_status['pending']) or 'in progress'}")
+                elif publish_status['state']=='failed':
+                    st.error(f"❌ Files were not uploaded: {publish_status['last_error']}")
+                elif publish_status['last_success'] is not None:
+                    st.caption(f"✅ Files uploaded at {publish_status['last_success']:%H:%M:%S}")
 
                     
     with sub_tabs_ex_post[2]:
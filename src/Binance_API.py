@@ -10,34 +10,109 @@
 from binance.spot import Spot
 #from binance.client import Client
 import pandas as pd
+import numpy as np
 import requests
 import datetime
+import time
+import threading
 from concurrent.futures import ThreadPoolExecutor, as_completed
 from multiprocessing import Pool, cpu_count
+from .Price_Store import PriceStore
+from .Rate_Limiter import WeightBucket,SAPI_WEIGHT_PER_MINUTE
+from .Http import MAX_WORKERS,mount
+from .Http_Cache import http_cache
+from .Binance_Async import AsyncKlineFetcher,KLINES_LIMIT,KLINES_WEIGHT,decode_klines,build_panel
 
 
 # In[3]:
 
 
+DAY_MS=86_400_000
+MINUTE_MS=60_000
+
+# Days per account_snapshot request and its request weight (SAPI, IP limit)
+SNAPSHOT_WINDOW_DAYS=30
+ACCOUNT_SNAPSHOT_WEIGHT=2400
+
+# Trades per my_trades request and its request weight
+MY_TRADES_LIMIT=1000
+MY_TRADES_WEIGHT=20
+
+# Seconds during which the all-symbols price snapshot is shared between callers
+SNAPSHOT_TTL=10
+
+_snapshot_cache={'time':None,'prices':None}
+_snapshot_lock=threading.Lock()
+
+MARKET_CAP_URL="https://www.binance.com/bapi/asset/v2/public/asset-service/product/get-products"
+
+# Seconds before the product list is revalidated with the server
+MARKET_CAP_TTL=300
+
+# quote -> (cached response it was computed from, market cap table)
+_market_cap_tables={}
+
+
 def daterange(start_date, end_date,interval=30):
     for n in range(0,int((end_date - start_date).days),interval):
         yield start_date + datetime.timedelta(n)
 
+def snapshot_quantities(snapshot_vos):
+
+    # account_snapshot 'snapshotVos' -> date x ticker quantities (free + locked), dates as '%Y-%m-%d'
+
+    holdings={}
+
+    for snapshot in snapshot_vos:
+
+        temp={}
+        date_key=pd.to_datetime(snapshot['updateTime'],unit='ms').strftime('%Y-%m-%d')
+
+        for balance in snapshot['data']['balances']:
+
+            temp[balance['asset']]=float(balance['free'])+float(balance['locked'])
+
+        holdings[date_key]=temp
+
+    quantities=pd.DataFrame(holdings).T
+    quantities.columns=quantities.columns+'USDT'
+
+    return quantities
+
 class BinanceAPI:
     
-    def __init__(self,binance_api_key,binance_api_secret):
+    def __init__(self,binance_api_key,binance_api_secret,price_store=None):
         
         self.binance_api_key=binance_api_key
         self.binance_api_secret=binance_api_secret
         
         self.binance_api=Spot(self.binance_api_key,self.binance_api_secret)
 
+        # Keeps the client's own headers (API key) but uses the shared connection pools
+        mount(self.binance_api.session)
+
+        # Optional PriceStore, when set get_price_threading only downloads the missing days
+        self.price_store=price_store
+
+        # Request weight shared by every concurrent download of this client
+        self.weight_bucket=WeightBucket()
+        self.sapi_weight_bucket=WeightBucket(capacity=SAPI_WEIGHT_PER_MINUTE)
+
+        # Optional stand-in for aiohttp.ClientSession used by get_price_async (see src/Replay.py)
+        self.async_session_factory=None
+
         #self.binance_api_client=Client(self.binance_api_key,self.binance_api_secret)
         
-    def get_market_cap(self,quote="USDT"):
+    def get_market_cap(self,quote="USDT",ttl=MARKET_CAP_TTL):
 
+        # The product list is shared by every session of the process and revalidated after ttl seconds
         
-        resp = requests.get("https://www.binance.com/bapi/asset/v2/public/asset-service/product/get-products")
+        resp = http_cache.get(MARKET_CAP_URL,ttl=ttl)
+
+        cached=_market_cap_tables.get(quote)
+
+        if cached is not None and cached[0] is resp:
+            return cached[1].copy()
 
         market_cap=pd.DataFrame(resp.json()['data'])
         market_cap=market_cap[market_cap['q']==quote]
@@ -50,33 +125,21 @@ class BinanceAPI:
 
         market_cap=market_cap.sort_values(by='Market Cap',ascending=False)
 
+        _market_cap_tables[quote]=(resp,market_cap)
 
-        return market_cap
+        return market_cap.copy()
 
 
     def get_price(self,ticker_list,date=datetime.datetime.today()):
         
         timestamp_sec=int((date-datetime.timedelta(1)).timestamp()*1000)
-        price=pd.DataFrame()
+        decoded={}
 
         for ticker in ticker_list:
+            if ticker=='USDTUSDT':
+                continue
             try:
-                
-                temp=pd.DataFrame()
-                numeric_columns =  ['Open Time', 'Open', 'High', 'Low', 'Close', 'Volume', 'Close Time', 'Quote Asset Volume', 
-                                'Number of Trades', 'TB Base Volume', 'TB Quote Volume', 'Ignore']
-
-                if ticker!='USDTUSDT':
-                    
-                    data = pd.DataFrame(self.binance_api.klines(ticker,"1d", startTime=timestamp_sec),columns=numeric_columns)
-                    data['Close Time']=pd.to_datetime(data['Close Time'], unit='ms')
-                    data=data.set_index('Close Time')
-                    temp[ticker]=data['Close'].astype(float)
-                    price=pd.concat([price,temp[ticker]],axis=1)
-                    
-                else:
-                    
-                    price[ticker]=1
+                decoded[ticker]=decode_klines(self.binance_api.klines(ticker,"1d", startTime=timestamp_sec))
 
             except Exception as e:
 
@@ -84,71 +147,229 @@ class BinanceAPI:
 
                 pass
 
-        price.index=pd.to_datetime(price.index).strftime('%Y-%m-%d')
+        price=build_panel(decoded,list(ticker_list))
+
+        if 'USDTUSDT' in ticker_list:
+            price['USDTUSDT']=1
+
+        price.index=price.index.strftime('%Y-%m-%d')
         
         return price
         
     def get_price_threading(self,tickers,start_date):
-            
-        today = datetime.date.today()
-        days_total = (today - start_date).days
-        if days_total <= 0:
+
+        if isinstance(start_date,datetime.datetime):
+            start_date=start_date.date()
+
+        if self.price_store is None:
+            return self.download_price_threading(tickers,start_date)
+
+        if (datetime.date.today()-start_date).days <= 0:
             print("Start date must be in the past.")
             return
 
-        remaining = days_total % 500
-        numbers_of_table = days_total // 500
-        
-        start_dt= datetime.datetime.combine(start_date, datetime.time())
-        end_dates = [
-                start_dt + datetime.timedelta(days=500 * i)
-                for i in range(numbers_of_table + 1)
-            ]
-    
-        end_dates.append(
-            datetime.datetime.combine(
-                today - datetime.timedelta(days=remaining),
-                datetime.time()
-            )
-        )
+        # Every ticker is downloaded from its own first missing day, up to date ones not at all
+        missing={
+            ticker:self.price_store.missing_start(ticker,start_date).date()
+            for ticker in tickers if ticker!='USDTUSDT' and not self.price_store.is_current(ticker,start_date)
+        }
 
-        def fetch_prices(end_date):
-            return self.get_price(tickers, end_date)
+        data=self.download_closes(missing) if missing else None
 
-        price = None
+        if data is not None:
 
-        try:
-            with ThreadPoolExecutor(max_workers=cpu_count()) as executor:
-                futures = [executor.submit(fetch_prices, d) for d in end_dates]
+            for ticker in data.columns:
+                covered_from=start_date if missing[ticker]<=start_date else None
+                self.price_store.write(ticker,data[ticker],covered_from=covered_from)
 
-                for future in as_completed(futures):
-                    data = future.result()
+        # get_price starts one day before the requested date, the store does the same
+        price=self.price_store.read_panel(tickers,start_date-datetime.timedelta(1))
 
-                    if price is None:
-                        price = data
-                    else:
-                        price = price.combine_first(data)
+        if 'USDTUSDT' in tickers:
+            price['USDTUSDT']=1.0
 
-        except Exception as e:
-            print("❌ Error while fetching prices:", e)
+        if price.empty:
+            print("❌ Error while fetching prices: no price retrieved")
             return
 
-        price = price.sort_index()
-        price = price[~price.index.duplicated(keep="first")]
-        price.index = pd.to_datetime(price.index)
-        
         return price
+
+    def get_price_async(self,tickers,start_date,max_concurrency=32):
+
+        # Same output as get_price_threading, every (ticker, window) request runs concurrently
+
+        fetcher=AsyncKlineFetcher(bucket=self.weight_bucket,max_concurrency=max_concurrency,session_factory=self.async_session_factory)
+
+        return fetcher.get_price(tickers,start_date)
+
+    def download_price_threading(self,tickers,start_date,max_workers=MAX_WORKERS):
+
+        if isinstance(start_date,datetime.datetime):
+            start_date=start_date.date()
+
+        if (datetime.date.today()-start_date).days <= 0:
+            print("Start date must be in the past.")
+            return
+
+        return self.download_closes({ticker:start_date for ticker in tickers},max_workers)
+
+    def download_closes(self,ticker_starts,max_workers=MAX_WORKERS):
+
+        # Daily closes of every ticker from its own start date to today
+        # The work is split into independent (ticker, window) units of KLINES_LIMIT days
+        # which write straight into one preallocated date x ticker array.
+
+        tickers=list(ticker_starts)
+
+        # get_price starts one day before the requested date
+        start_ms={
+            ticker:int(datetime.datetime.combine(start-datetime.timedelta(1),datetime.time()).timestamp()*1000)
+            for ticker,start in ticker_starts.items()
+        }
+
+        now_ms=int(datetime.datetime.now().timestamp()*1000)
+        first_day=min(start_ms.values())//DAY_MS
+        last_day=now_ms//DAY_MS+1
+
+        values=np.full((last_day-first_day+1,len(tickers)),np.nan)
+
+        units=[
+            (column,ticker,window_start)
+            for column,ticker in enumerate(tickers) if ticker!='USDTUSDT'
+            for window_start in range(start_ms[ticker],now_ms,KLINES_LIMIT*DAY_MS)
+        ]
+
+        def fetch_unit(column,ticker,window_start):
+
+            self.weight_bucket.acquire(KLINES_WEIGHT)
+            data=self.binance_api.klines(ticker,"1d",startTime=window_start,limit=KLINES_LIMIT)
+
+            if not data:
+                return
+
+            days,close=decode_klines(data)
+            rows=days-first_day
+
+            inside=(rows>=0)&(rows<values.shape[0])
+            values[rows[inside],column]=close[inside]
+
+        failed=set()
+
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            futures={executor.submit(fetch_unit,*unit):unit[1] for unit in units}
+
+            for future in as_completed(futures):
+                try:
+                    future.result()
+                except Exception as e:
+                    failed.add(futures[future])
+
+        for ticker in failed:
+            print(ticker +" not retrieved")
+
+        if 'USDTUSDT' in tickers:
+            values[:,tickers.index('USDTUSDT')]=1.0
+
+        retrieved=np.array([ticker not in failed for ticker in tickers])
+        observed=np.array([ticker!='USDTUSDT' for ticker in tickers])&retrieved
+
+        # Keep the days on which at least one ticker traded, as concatenating per-ticker frames did
+        rows=~np.isnan(values[:,observed]).all(axis=1) if observed.any() else np.ones(values.shape[0],dtype=bool)
+
+        if not rows.any():
+            print("❌ Error while fetching prices: no price retrieved")
+            return
+
+        dates=pd.to_datetime(np.arange(first_day,last_day+1)[rows],unit='D')
+
+        return pd.DataFrame(values[np.ix_(rows,retrieved)],index=dates,columns=[ticker for ticker in tickers if ticker not in failed])
+
+    def get_minute_closes(self,minutes_by_ticker,max_workers=MAX_WORKERS):
+
+        # {ticker: minute indexes (open time // 1 minute)} -> {ticker: (sorted minute indexes, closes)}
+        # Needed minutes are covered by pages of KLINES_LIMIT candles, each page starting
+        # at the first minute not yet covered, and all pages are downloaded concurrently.
+
+        units=[]
+
+        for ticker,minutes in minutes_by_ticker.items():
+
+            minutes=np.unique(np.asarray(minutes,dtype=np.int64))
+            position=0
+
+            while position<len(minutes):
+                units.append((ticker,int(minutes[position])))
+                position=np.searchsorted(minutes,minutes[position]+KLINES_LIMIT)
+
+        def fetch_page(ticker,first_minute):
+
+            self.weight_bucket.acquire(KLINES_WEIGHT)
+            requested_ms=int(time.time()*1000)
+            data=self.binance_api.klines(ticker,interval='1m',startTime=first_minute*MINUTE_MS,limit=KLINES_LIMIT)
+
+            # A page reaching the present ends with the still open candle, its close is provisional
+            # and callers (the minute store) keep these closes for good, so it is dropped
+            data=[kline for kline in data if kline[6]<requested_ms]
+
+            return ticker,decode_klines(data,MINUTE_MS)
+
+        pages={}
+
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            for ticker,(minutes,close) in executor.map(lambda unit: fetch_page(*unit),units):
+                pages.setdefault(ticker,[]).append((minutes,close))
+
+        closes={}
+
+        for ticker,chunks in pages.items():
+
+            minutes=np.concatenate([chunk[0] for chunk in chunks])
+            close=np.concatenate([chunk[1] for chunk in chunks])
+            minutes,first=np.unique(minutes,return_index=True)
+
+            closes[ticker]=(minutes,close[first])
+
+        return closes
+
+    def get_price_snapshot(self,ttl=SNAPSHOT_TTL):
+
+        # Last price of every symbol from a single ticker/price request
+        # The result is kept ttl seconds and shared by every client of the process.
+
+        with _snapshot_lock:
+
+            now=time.monotonic()
+
+            if _snapshot_cache['prices'] is None or now-_snapshot_cache['time']>ttl:
+
+                data=pd.DataFrame(self.binance_api.ticker_price())
+                prices=data.set_index('symbol')['price'].astype(float)
+                prices['USDTUSDT']=1.0
+
+                _snapshot_cache['time']=now
+                _snapshot_cache['prices']=prices
+
+            return _snapshot_cache['prices']
+
+    def get_inventory(self,user_assets=None,snapshot=True):
         
-    def get_inventory(self):
-        
-        
-        ptf=pd.DataFrame(self.binance_api.user_asset())
+        # user_assets: result of user_asset() if the caller already has it
+        # snapshot: value the holdings with get_price_snapshot instead of one klines request per asset
+
+        if user_assets is None:
+            user_assets=self.binance_api.user_asset()
+
+        ptf=pd.DataFrame(user_assets)
         ptf['Ticker']=ptf['asset']+"USDT"
 
         ticker=ptf['Ticker'].to_list()
         ptf=ptf.set_index('Ticker')
 
-        price=self.get_price(ptf.index).T
+        if snapshot:
+            price=self.get_price_snapshot().reindex(ticker).to_frame()
+        else:
+            price=self.get_price(ptf.index).T
+
         price.columns=['Price']
 
         data=pd.concat([price,ptf],axis=1)
@@ -170,76 +391,148 @@ class BinanceAPI:
         timestamp_end = int(timestamp_sec * 1000)
     
         snapshots=self.binance_api.account_snapshot(type='SPOT',limit=30,endTime=timestamp_end)
-        all_key=snapshots['snapshotVos']  
+
+        quantities=snapshot_quantities(snapshots['snapshotVos'])
+
+        crypto=quantities.columns
+
+        prices=self.get_price(crypto,startdate)
+        prices=prices.loc[~prices.index.duplicated(keep='last')]
+        positions=pd.DataFrame()
+        # for col in crypto:
+        #     try:
+        #         positions[col]=quantities[col]*prices.loc[quantities.index][col]
+        #     except Exception as e:
+
+        #         print(col)
+        positions = quantities * prices.loc[quantities.index]
+        positions=positions.groupby(level=0).sum()
         
-        history={}
-        tickers=set()
+        return positions,quantities
 
-        for i in range(len(all_key)):
+    def get_positions_history_range(self,start_date,end_date=None,max_workers=4):
 
-            history[all_key[i]['updateTime']]=all_key[i]['data']['balances']
+        # Daily positions and quantities over [start_date, end_date]
+        # The 30-day account_snapshot windows are requested concurrently within the SAPI weight
+        # limit and every snapshot is valued against one price panel downloaded once.
+        # Binance only serves snapshots of roughly the last month, older windows come back empty.
 
-        for key in history.keys():
-            holding=history[key]
+        if isinstance(start_date,datetime.datetime):
+            start_date=start_date.date()
 
-            for i in range(len(holding)):
-                tickers.add(holding[i]['asset']+"USDT")
+        end_date=end_date or datetime.date.today()
 
-        tickers=list(tickers)
-        holdings={}
+        if isinstance(end_date,datetime.datetime):
+            end_date=end_date.date()
 
-        for key in history.keys():
+        windows=[]
+        window_start=start_date
 
-            temp={}
-            date_key=pd.to_datetime(key,unit='ms').strftime('%Y-%m-%d')
+        while window_start<=end_date:
+            window_end=min(window_start+datetime.timedelta(SNAPSHOT_WINDOW_DAYS-1),end_date)
+            windows.append((window_start,window_end))
+            window_start=window_end+datetime.timedelta(1)
 
-            for i in range(len(history[key])):
+        def fetch_window(window_start,window_end):
 
-                temp[history[key][i]['asset']]=float(history[key][i]['free'])+float(history[key][i]['locked'])
+            start_ms=int(datetime.datetime.combine(window_start,datetime.time()).timestamp()*1000)
+            end_ms=int(datetime.datetime.combine(window_end,datetime.time.max).timestamp()*1000)
 
-            holdings[date_key]=temp
+            self.sapi_weight_bucket.acquire(ACCOUNT_SNAPSHOT_WEIGHT)
+            snapshots=self.binance_api.account_snapshot(type='SPOT',limit=SNAPSHOT_WINDOW_DAYS,startTime=start_ms,endTime=end_ms)
 
-        quantities=pd.DataFrame(holdings).T
-        quantities.columns=quantities.columns+'USDT'
+            return snapshots.get('snapshotVos',[])
 
+        snapshot_vos=[]
 
-        crypto=quantities.columns
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            futures={executor.submit(fetch_window,*window):window for window in windows}
 
-        prices=self.get_price(crypto,startdate)
-        prices=prices.loc[~prices.index.duplicated(keep='last')]
-        positions=pd.DataFrame()
-        # for col in crypto:
-        #     try:
-        #         positions[col]=quantities[col]*prices.loc[quantities.index][col]
-        #     except Exception as e:
+            for future in as_completed(futures):
+                try:
+                    snapshot_vos.extend(future.result())
+                except Exception as e:
+                    print(f"Snapshots from {futures[future][0]} to {futures[future][1]} not retrieved: {e}")
 
-        #         print(col)
-        positions = quantities * prices.loc[quantities.index]
+        if not snapshot_vos:
+            print("No account snapshot retrieved")
+            return pd.DataFrame(),pd.DataFrame()
+
+        quantities=snapshot_quantities(snapshot_vos)
+        quantities.index=pd.to_datetime(quantities.index)
+        quantities=quantities.sort_index()
+
+        prices=self.get_price_threading(list(quantities.columns),quantities.index[0].date())
+
+        if prices is None:
+            prices=pd.DataFrame(index=quantities.index)
+
+        positions=quantities*prices.reindex(quantities.index)
         positions=positions.groupby(level=0).sum()
-        
+
         return positions,quantities
-    
+
+    def get_symbol_trades(self,symbol,from_id=0):
+
+        # Every trade of a symbol with an id >= from_id, paging with fromId
+
+        trades=[]
+
+        while True:
+
+            self.weight_bucket.acquire(MY_TRADES_WEIGHT)
+            page=self.binance_api.my_trades(symbol=symbol,fromId=from_id,limit=MY_TRADES_LIMIT)
+            trades.extend(page)
+
+            if len(page)<MY_TRADES_LIMIT:
+                return trades
+
+            from_id=page[-1]['id']+1
+
+    def download_trades(self,from_ids,max_workers=MAX_WORKERS):
+
+        # {symbol: first trade id} -> one frame of the trades, symbols requested concurrently
+
+        trades=[]
+
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            futures={executor.submit(self.get_symbol_trades,symbol,from_id):symbol for symbol,from_id in from_ids.items()}
+
+            for future in as_completed(futures):
+                try:
+                    trades.extend(future.result())
+                except Exception as e:
+                    print(futures[future] +" trades not retrieved")
+
+        history=pd.DataFrame(trades)
+
+        if history.empty:
+            return history
+
+        history['time']=pd.to_datetime(history['time'],unit='ms')
+
+        for col in ['price','qty','quoteQty','commission']:
+            if col in history.columns:
+                history[col]=history[col].astype(float)
+
+        return history
 
     def get_trades(self,symbols):
             
-            trades={}
-            history=pd.DataFrame()
-            
-            for symbol in symbols:
-                trades[symbol]=self.binance_api.my_trades(symbol=symbol)
-            
-            for key in trades:
-                
-                history=pd.concat([history,pd.DataFrame(trades[key])])
-                
-            history['time']=pd.to_datetime(history['time'],unit='ms')
-            
-                
-            return history
+        history=self.download_trades({symbol:0 for symbol in symbols})
 
+        return history
 
-# In[ ]:
+    def sync_trades(self,symbols,ledger):
+
+        # Downloads only the trades newer than the ledger cursors, appends them and returns the full ledger
 
+        cursors=ledger.cursors()
+        new_trades=self.download_trades({symbol:cursors.get(symbol,-1)+1 for symbol in symbols})
 
+        ledger.append(new_trades)
 
+        return ledger.read(symbols)
 
+
+# In[ ]:
@@ -0,0 +1,230 @@
+# Copyright (c) 2025 Niroojane Selvam
+# Licensed under the MIT License. See LICENSE file in the project root for full license information.
+
+
+#!/usr/bin/env python
+# coding: utf-8
+
+import asyncio
+import datetime
+import threading
+import aiohttp
+import numpy as np
+import pandas as pd
+
+from .Rate_Limiter import WeightBucket
+
+
+BINANCE_BASE_URL='https://api.binance.com'
+
+KLINES_LIMIT=1000
+KLINES_WEIGHT=2
+
+INTERVAL_MS={
+    '1m':60_000,
+    '1h':3_600_000,
+    '1d':86_400_000,
+}
+
+
+def decode_klines(data,interval_ms=INTERVAL_MS['1d']):
+
+    # Raw klines -> (int64 candle index since epoch, float64 close), without any intermediate frame
+    # With the default daily interval the index is the epoch day of the close time.
+
+    count=len(data)
+    close=np.fromiter((kline[4] for kline in data),dtype=np.float64,count=count)
+    close_time=np.fromiter((kline[6] for kline in data),dtype=np.int64,count=count)
+
+    return close_time//interval_ms,close
+
+
+def build_panel(decoded,tickers=None,interval='1d'):
+
+    # {ticker: (index, close)} -> date x ticker frame, aligned once on the union of the indexes
+
+    if tickers is None:
+        tickers=list(decoded)
+
+    tickers=[ticker for ticker in tickers if ticker in decoded]
+
+    if not tickers:
+        return pd.DataFrame(index=pd.DatetimeIndex([]))
+
+    index=np.unique(np.concatenate([decoded[ticker][0] for ticker in tickers]))
+    values=np.full((len(index),len(tickers)),np.nan)
+
+    for column,ticker in enumerate(tickers):
+        rows,close=decoded[ticker]
+        values[np.searchsorted(index,rows),column]=close
+
+    dates=(index*INTERVAL_MS[interval]).astype('datetime64[ms]')
+
+    return pd.DataFrame(values,index=pd.DatetimeIndex(dates),columns=tickers)
+
+
+def run_coroutine(coroutine):
+
+    # asyncio.run cannot be nested in a running loop (Jupyter), use a worker thread there
+
+    try:
+        asyncio.get_running_loop()
+    except RuntimeError:
+        return asyncio.run(coroutine)
+
+    result={}
+
+    def target():
+        try:
+            result['value']=asyncio.run(coroutine)
+        except BaseException as e:
+            result['error']=e
+
+    thread=threading.Thread(target=target)
+    thread.start()
+    thread.join()
+
+    if 'error' in result:
+        raise result['error']
+
+    return result['value']
+
+
+class AsyncKlineFetcher:
+
+    """
+    Concurrent kline downloader.
+
+    The requested history is split into independent (ticker, window) requests
+    of KLINES_LIMIT candles which are all scheduled at once on one aiohttp
+    session. Throughput is bounded by the shared WeightBucket, i.e. by the
+    exchange weight limit, and not by the number of tickers.
+    """
+
+    def __init__(self,base_url=BINANCE_BASE_URL,bucket=None,max_concurrency=32,max_retries=5,timeout=30,session_factory=None):
+
+        self.base_url=base_url
+        self.bucket=bucket if bucket is not None else WeightBucket()
+        self.max_concurrency=max_concurrency
+        self.max_retries=max_retries
+        self.timeout=timeout
+
+        # Returns the session to use instead of an aiohttp.ClientSession, e.g. ReplayAdapter.async_session
+        self.session_factory=session_factory
+
+    async def _request(self,session,semaphore,params):
+
+        url=f'{self.base_url}/api/v3/klines'
+
+        for attempt in range(self.max_retries):
+
+            await self.bucket.acquire_async(KLINES_WEIGHT)
+
+            async with semaphore:
+                try:
+                    async with session.get(url,params=params) as response:
+
+                        self.bucket.update_from_headers(response.headers)
+
+                        if response.status in (418,429):
+                            retry_after=float(response.headers.get('Retry-After',2**attempt))
+                            self.bucket.block(retry_after)
+                            continue
+
+                        if response.status>=500:
+                            await asyncio.sleep(2**attempt)
+                            continue
+
+                        response.raise_for_status()
+
+                        return await response.json()
+
+                except (aiohttp.ClientConnectionError,asyncio.TimeoutError):
+                    await asyncio.sleep(2**attempt)
+
+        raise ConnectionError(f"{params['symbol']} klines not retrieved after {self.max_retries} attempts")
+
+    async def _fetch_window(self,session,semaphore,ticker,interval,start_ms):
+
+        params={
+            'symbol':ticker,
+            'interval':interval,
+            'startTime':start_ms,
+            'limit':KLINES_LIMIT
+        }
+
+        try:
+            return ticker,await self._request(session,semaphore,params)
+
+        except Exception as e:
+            return ticker,None
+
+    async def fetch(self,tickers,start_date,interval='1d'):
+
+        # Raw klines per ticker covering [start_date - 1 interval, now]
+
+        step=INTERVAL_MS[interval]
+        start=datetime.datetime.combine(start_date,datetime.time(),tzinfo=datetime.timezone.utc)
+        start_ms=int(start.timestamp()*1000)-step
+        now_ms=int(datetime.datetime.now(datetime.timezone.utc).timestamp()*1000)
+
+        windows=range(start_ms,now_ms,KLINES_LIMIT*step)
+
+        semaphore=asyncio.Semaphore(self.max_concurrency)
+
+        if self.session_factory is not None:
+            client=self.session_factory()
+        else:
+            connector=aiohttp.TCPConnector(limit=self.max_concurrency)
+            timeout=aiohttp.ClientTimeout(total=self.timeout)
+            client=aiohttp.ClientSession(connector=connector,timeout=timeout)
+
+        async with client as session:
+
+            tasks=[
+                self._fetch_window(session,semaphore,ticker,interval,window_start)
+                for ticker in tickers if ticker!='USDTUSDT'
+                for window_start in windows
+            ]
+
+            results=await asyncio.gather(*tasks)
+
+        klines={}
+        failed=set()
+
+        for ticker,data in results:
+            if data is None:
+                failed.add(ticker)
+            elif data:
+                klines.setdefault(ticker,[]).extend(data)
+
+        for ticker in failed:
+            print(ticker +" not retrieved")
+            klines.pop(ticker,None)
+
+        return klines
+
+    def get_price(self,tickers,start_date,interval='1d'):
+
+        # Same output as BinanceAPI.get_price_threading
+
+        if isinstance(start_date,datetime.datetime):
+            start_date=start_date.date()
+
+        klines=run_coroutine(self.fetch(tickers,start_date,interval))
+
+        decoded={
+            ticker:decode_klines(data,INTERVAL_MS[interval])
+            for ticker,data in klines.items()
+        }
+
+        price=build_panel(decoded,tickers,interval)
+
+        if price.empty:
+            print("❌ Error while fetching prices: no price retrieved")
+            return
+
+        if 'USDTUSDT' in tickers:
+            price['USDTUSDT']=1.0
+
+        return price
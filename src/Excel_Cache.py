@@ -0,0 +1,145 @@
+# Copyright (c) 2025 Niroojane Selvam
+# Licensed under the MIT License. See LICENSE file in the project root for full license information.
+
+
+#!/usr/bin/env python
+# coding: utf-8
+
+import os
+import json
+import shutil
+import hashlib
+import pandas as pd
+from io import BytesIO
+
+from .Http_Cache import RevalidatingCache
+
+
+DEFAULT_EXCEL_CACHE_ROOT=os.path.join('data','http')
+
+
+class ExcelCache(RevalidatingCache):
+
+    """
+    On-disk cache of Excel files downloaded over HTTP.
+
+    Each URL gets a directory ``<root>/<sha1 of url>`` holding the raw bytes,
+    the ETag / Last-Modified they were served with, and the parsed frame as
+    Parquet for every index_col it was read with. Every read revalidates with
+    If-None-Match / If-Modified-Since; a 304 answer returns the cached frame
+    without parsing the workbook again.
+    """
+
+    def __init__(self,root=DEFAULT_EXCEL_CACHE_ROOT,timeout=30):
+
+        super().__init__(timeout)
+
+        self.root=root
+
+    def _directory(self,url):
+
+        return os.path.join(self.root,hashlib.sha1(url.encode()).hexdigest())
+
+    def _meta(self,url):
+
+        path=os.path.join(self._directory(url),'meta.json')
+
+        if not os.path.exists(path):
+            return None
+
+        with open(path) as f:
+            return json.load(f)
+
+    def _frame_path(self,url,index_col):
+
+        return os.path.join(self._directory(url),f'frame-{index_col}.parquet')
+
+    def _cached_frame(self,url,index_col):
+
+        path=self._frame_path(url,index_col)
+
+        if os.path.exists(path):
+            return pd.read_parquet(path)
+
+        # Bytes cached but never parsed with this index_col
+        with open(os.path.join(self._directory(url),'body.xlsx'),'rb') as f:
+            return self._parse(url,f.read(),index_col)
+
+    def _parse(self,url,content,index_col):
+
+        frame=pd.read_excel(BytesIO(content),index_col=index_col)
+        path=self._frame_path(url,index_col)
+
+        try:
+            frame.to_parquet(path+'.tmp')
+            os.replace(path+'.tmp',path)
+        except (ValueError,TypeError) as e:
+            # e.g. mixed type columns, the bytes are still cached
+            print(f"Parsed frame of {url} not cached: {e}")
+
+        return frame
+
+    def _store(self,url,response):
+
+        directory=self._directory(url)
+        os.makedirs(directory,exist_ok=True)
+
+        # Frames parsed from the previous version are stale
+        for name in os.listdir(directory):
+            if name.startswith('frame-'):
+                os.remove(os.path.join(directory,name))
+
+        with open(os.path.join(directory,'body.xlsx.tmp'),'wb') as f:
+            f.write(response.content)
+        os.replace(os.path.join(directory,'body.xlsx.tmp'),os.path.join(directory,'body.xlsx'))
+
+        meta={
+            'url':url,
+            'etag':response.headers.get('ETag'),
+            'last_modified':response.headers.get('Last-Modified'),
+            'sha1':hashlib.sha1(response.content).hexdigest(),
+        }
+
+        with open(os.path.join(directory,'meta.json.tmp'),'w') as f:
+            json.dump(meta,f)
+        os.replace(os.path.join(directory,'meta.json.tmp'),os.path.join(directory,'meta.json'))
+
+    def read(self,url,index_col=None):
+
+        with self._url_lock(url):
+
+            meta=self._meta(url)
+
+            if meta is None:
+                response=self._revalidate(url)
+            else:
+                response=self._revalidate(url,meta.get('etag'),meta.get('last_modified'),cached=True)
+
+            if response is None or response.status_code==304:
+                return self._cached_frame(url,index_col)
+
+            self._store(url,response)
+
+            return self._parse(url,response.content,index_col)
+
+    def version(self,url):
+
+        # Identifier of the cached copy of a URL (its ETag, else a hash of its bytes), None if not cached
+
+        meta=self._meta(url)
+
+        if meta is None:
+            return None
+
+        return meta.get('etag') or meta.get('sha1') or meta.get('last_modified')
+
+    def clear(self,url=None):
+
+        with self._lock:
+
+            directory=self.root if url is None else self._directory(url)
+            shutil.rmtree(directory,ignore_errors=True)
+
+
+# Workbooks read by Metrics.read_excel_from_url
+excel_cache=ExcelCache()
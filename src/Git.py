@@ -1,7 +1,24 @@
+import re
+import hashlib
+import threading
+import zipfile
 import requests
 from io import BytesIO
 import base64
 
+from .Http import session
+from .Publish_Queue import PublishQueue
+
+GITHUB_API_URL = 'https://api.github.com'
+
+# Timestamp written into every workbook, so unchanged data gives unchanged bytes
+FIXED_ZIP_TIME = (1980, 1, 1, 0, 0, 0)
+FIXED_CORE_TIME = '1980-01-01T00:00:00Z'
+
+# One queue per repository and branch, shared by the GitHub objects Streamlit recreates on every rerun
+_publish_queues = {}
+_publish_queues_lock = threading.Lock()
+
 token = ''
 repo_owner = ''
 repo_name = ''
@@ -9,40 +26,99 @@ branch = ''
 binance_api_key=''
 binance_api_secret=''
 
+def excel_bytes(df):
+
+    # Workbook bytes that only depend on the data: openpyxl stamps the zip entries
+    # and the core properties with the current time, both are pinned here
+
+    excel_buffer = BytesIO()
+    df.to_excel(excel_buffer, index=True, engine='openpyxl')
+
+    output = BytesIO()
+
+    with zipfile.ZipFile(excel_buffer) as source, zipfile.ZipFile(output, 'w') as target:
+        for info in source.infolist():
+            data = source.read(info.filename)
+
+            if info.filename == 'docProps/core.xml':
+                data = re.sub(rb'(<dcterms:(created|modified)[^>]*>)[^<]*', rb'\g<1>' + FIXED_CORE_TIME.encode(), data)
+
+            target.writestr(zipfile.ZipInfo(info.filename, date_time=FIXED_ZIP_TIME), data, compress_type=zipfile.ZIP_DEFLATED)
+
+    return output.getvalue()
+
+
+def blob_sha(content):
+
+    # SHA the git object of this content has, as listed in GitHub trees and contents
+    return hashlib.sha1(b'blob %d\0' % len(content) + content).hexdigest()
+
+
 class GitHub:
 
-    def __init__(self,token,repo_owner,repo_name,branch):
+    def __init__(self,token,repo_owner,repo_name,branch,api_url=GITHUB_API_URL):
 
         self.token=token
         self.repo_owner=repo_owner
         self.repo_name=repo_name
         self.branch=branch
 
-    def push_or_update_file(self,df,file_name):
+        # Points to a stand-in server in tests
+        self.api_url=api_url.rstrip('/')
+
+    @property
+    def publish_queue(self):
+
+        key = (self.api_url, self.repo_owner, self.repo_name, self.branch)
+
+        with _publish_queues_lock:
+            if key not in _publish_queues:
+                _publish_queues[key] = PublishQueue(self._publish_queued)
+            return _publish_queues[key]
+
+    @property
+    def headers(self):
+
+        return {
+            'Authorization': f'token {self.token}',
+            'Accept': 'application/vnd.github.v3+json'
+        }
+
+    @property
+    def repo_url(self):
+
+        return f'{self.api_url}/repos/{self.repo_owner}/{self.repo_name}'
+
+    def push_or_update_file(self,df,file_name,sync=False):
+        # Queued for the background publisher unless sync is set
+        if not sync:
+            self.enqueue_file(df, file_name, message=f'Add/Update {file_name}.xlsx via API')
+            return
+
         # Prepare file path
         file_path = f'{file_name}.xlsx'
         
-        excel_buffer = BytesIO()
-        df.to_excel(excel_buffer, index=True,engine='openpyxl')
-        excel_data = excel_buffer.getvalue()
+        excel_data = excel_bytes(df)
         
         # Encode content to Base64
         encoded_content = base64.b64encode(excel_data).decode()
         
         # GitHub API URLs
-        url = f'https://api.github.com/repos/{self.repo_owner}/{self.repo_name}/contents/{file_path}'
+        url = f'{self.repo_url}/contents/{file_path}'
         
-        headers = {
-            'Authorization': f'token {self.token}',
-            'Accept': 'application/vnd.github.v3+json'
-        }
+        headers = self.headers
         
         # --- STEP 1: Check if file exists to get SHA ---
         sha = None
-        get_response = requests.get(url, headers=headers, params={'ref': self.branch})
+        get_response = session.get(url, headers=headers, params={'ref': self.branch})
         
         if get_response.status_code == 200:
             sha = get_response.json()['sha']
+
+            if sha == blob_sha(excel_data):
+                print(f'⏭️ {file_path} unchanged. Skipping upload.')
+                return
+
             print(f'🔁 File exists. Will update (SHA: {sha})')
         elif get_response.status_code == 404:
             print('🆕 File does not exist. Will create new.')
@@ -61,7 +137,7 @@ class GitHub:
             data['sha'] = sha  # Needed for updates
         
         # --- STEP 3: PUT request to create/update file ---
-        put_response = requests.put(url, headers=headers, json=data)
+        put_response = session.put(url, headers=headers, json=data)
         
         if put_response.status_code in [200, 201]:
             print('✅ File pushed/updated successfully!')
@@ -70,31 +146,30 @@ class GitHub:
             print(put_response.json())
 
 
-    def create_or_replace_notebook(self,file_path, commit_message="Create/Replace Jupyter Notebook"):
+    def create_or_replace_notebook(self,file_path, commit_message="Create/Replace Jupyter Notebook", sync=False):
         """
         Create or replace a Jupyter Notebook file in a GitHub repository.
         
         :param file_path: Path to the local Jupyter notebook file (.ipynb)
-        :param repo_owner: GitHub username (repository owner)
-        :param repo_name: Name of the repository
-        :param token: GitHub personal access token with repo permissions
         :param commit_message: Commit message for creating/replacing the file
-        :param branch: The branch where the file will be pushed (default is 'main')
+        :param sync: Push now instead of queueing it for the background publisher
         """
         # Read the file content and encode it in base64
         with open(file_path, "rb") as f:
             file_content = f.read()
         
-        encoded_content = base64.b64encode(file_content).decode("utf-8")
-        
         # Define the API URL to upload or replace the file
         file_name = file_path.split("/")[-1]  # Get the file name
-        url = f"https://api.github.com/repos/{self.repo_owner}/{self.repo_name}/contents/{file_name}"
+
+        if not sync:
+            self.enqueue_files({file_name: file_content}, message=commit_message)
+            return
+
+        encoded_content = base64.b64encode(file_content).decode("utf-8")
+        
+        url = f"{self.repo_url}/contents/{file_name}"
     
-        headers = {
-            "Authorization": f"token {self.token}",
-            "Accept": "application/vnd.github.v3+json"
-        }
+        headers = self.headers
     
         # Data payload for creating or updating the file
         data = {
@@ -104,7 +179,7 @@ class GitHub:
         }
     
         # --- STEP 1: Check if the file exists to get the SHA ---
-        get_response = requests.get(url, headers=headers)
+        get_response = session.get(url, headers=headers)
         
         if get_response.status_code == 200:
             # If file exists, we need to get the SHA to replace it
@@ -123,10 +198,146 @@ class GitHub:
             return
     
         # --- STEP 2: Make the PUT request to create or update the file ---
-        response = requests.put(url, headers=headers, json=data)
+        response = session.put(url, headers=headers, json=data)
     
         if response.status_code == 201 or response.status_code == 200:
             print(f"✅ File '{file_name}' successfully pushed/updated to GitHub!")
         else:
             print(f"❌ Failed to push/update file: {response.status_code}")
-            print(response.json())
\ No newline at end of file
+            print(response.json())
+
+
+    def publish_files(self, files, message='Update files via API'):
+        """
+        Push several files to the branch as a single commit.
+
+        :param files: dict of repository path -> file bytes
+        :param message: Commit message
+        :return: SHA of the commit holding the files (the current head when
+                 nothing changed), None on error
+        """
+        headers = self.headers
+
+        # --- STEP 1: Current commit and tree of the branch ---
+        ref_response = session.get(f'{self.repo_url}/git/ref/heads/{self.branch}', headers=headers)
+
+        if ref_response.status_code != 200:
+            print(f'❌ Error reading branch {self.branch}: {ref_response.status_code}')
+            print(ref_response.json())
+            return None
+
+        head_sha = ref_response.json()['object']['sha']
+        tree_sha = session.get(f'{self.repo_url}/git/commits/{head_sha}', headers=headers).json()['tree']['sha']
+
+        tree_response = session.get(f'{self.repo_url}/git/trees/{tree_sha}', headers=headers, params={'recursive': 1})
+        remote_shas = {entry['path']: entry['sha'] for entry in tree_response.json()['tree'] if entry['type'] == 'blob'}
+
+        # --- STEP 2: Keep only the files whose content changed ---
+        changed = {path: content for path, content in files.items() if remote_shas.get(path) != blob_sha(content)}
+
+        for path in files:
+            if path not in changed:
+                print(f'⏭️ {path} unchanged. Skipping upload.')
+
+        if not changed:
+            return head_sha
+
+        # --- STEP 3: Upload the new blobs ---
+        tree = []
+
+        for path, content in changed.items():
+            blob_response = session.post(
+                f'{self.repo_url}/git/blobs',
+                headers=headers,
+                json={'content': base64.b64encode(content).decode(), 'encoding': 'base64'}
+            )
+
+            if blob_response.status_code != 201:
+                print(f'❌ Failed to upload {path}: {blob_response.status_code}')
+                print(blob_response.json())
+                return None
+
+            tree.append({'path': path, 'mode': '100644', 'type': 'blob', 'sha': blob_response.json()['sha']})
+
+        # --- STEP 4: One tree and one commit for all of them ---
+        tree_response = session.post(f'{self.repo_url}/git/trees', headers=headers, json={'base_tree': tree_sha, 'tree': tree})
+
+        if tree_response.status_code != 201:
+            print(f'❌ Failed to create tree: {tree_response.status_code}')
+            print(tree_response.json())
+            return None
+
+        commit_response = session.post(
+            f'{self.repo_url}/git/commits',
+            headers=headers,
+            json={'message': message, 'tree': tree_response.json()['sha'], 'parents': [head_sha]}
+        )
+
+        if commit_response.status_code != 201:
+            print(f'❌ Failed to create commit: {commit_response.status_code}')
+            print(commit_response.json())
+            return None
+
+        commit_sha = commit_response.json()['sha']
+
+        # --- STEP 5: Move the branch, fails if it moved since STEP 1 ---
+        update_response = session.patch(f'{self.repo_url}/git/refs/heads/{self.branch}', headers=headers, json={'sha': commit_sha})
+
+        if update_response.status_code != 200:
+            print(f'❌ Failed to update branch {self.branch}: {update_response.status_code}')
+            print(update_response.json())
+            return None
+
+        print(f"✅ {', '.join(changed)} pushed in commit {commit_sha[:7]}")
+
+        return commit_sha
+
+    def publish_frames(self, frames, message='Update files via API'):
+        """
+        Push several DataFrames as Excel files in a single commit.
+
+        :param frames: dict of file name (without .xlsx) -> DataFrame
+        """
+        files = {f'{file_name}.xlsx': excel_bytes(df) for file_name, df in frames.items()}
+
+        return self.publish_files(files, message=message)
+
+    def enqueue_file(self, df, file_name, message=None, save_local=False):
+        """
+        Queue a DataFrame for publishing as <file_name>.xlsx and return at once.
+
+        Files queued within the debounce window go out together in one commit
+        (see publish_files); save_local also writes the workbook to the
+        working directory from the background thread.
+        """
+        self.enqueue_frames({file_name: df}, message=message, save_local=save_local)
+
+    def enqueue_frames(self, frames, message=None, save_local=False):
+
+        # Copies, so later edits of the caller's frames do not leak into the upload
+        self.publish_queue.submit(
+            {f'{file_name}.xlsx': (df.copy(), save_local) for file_name, df in frames.items()},
+            message=message
+        )
+
+    def enqueue_files(self, files, message=None):
+
+        # Repository path -> bytes, published like the queued frames
+        self.publish_queue.submit({path: (content, False) for path, content in files.items()}, message=message)
+
+    def publish_status(self):
+
+        return self.publish_queue.status()
+
+    def _publish_queued(self, files, message):
+
+        contents = {}
+
+        for path, (data, save_local) in files.items():
+            contents[path] = data if isinstance(data, bytes) else excel_bytes(data)
+
+            if save_local:
+                with open(path, 'wb') as f:
+                    f.write(contents[path])
+
+        return self.publish_files(contents, message=message or f"Add/Update {', '.join(contents)} via API")
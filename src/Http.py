@@ -0,0 +1,81 @@
+# Copyright (c) 2025 Niroojane Selvam
+# Licensed under the MIT License. See LICENSE file in the project root for full license information.
+
+
+#!/usr/bin/env python
+# coding: utf-8
+
+import os
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+
+# Threads of the download pools, one pooled connection each
+MAX_WORKERS=min(32,4*(os.cpu_count() or 1))
+
+# Connections kept per host that has no limit of its own
+DEFAULT_POOL_SIZE=8
+
+# Per host connection limits, the Binance pool is as large as the download thread pools
+HOST_POOL_SIZES={
+    'https://api.binance.com':MAX_WORKERS,
+    'https://api.github.com':4,
+}
+
+# (connect, read) seconds, used when a call does not pass its own timeout
+DEFAULT_TIMEOUT=(5,30)
+
+RETRY=Retry(
+    total=5,
+    backoff_factor=0.5,
+    status_forcelist=(429,500,502,503,504),
+    allowed_methods=frozenset({'GET','HEAD','PUT','DELETE','OPTIONS'}),
+    respect_retry_after_header=True,
+    # The last response is returned as is, callers keep checking status codes
+    raise_on_status=False,
+)
+
+
+class PooledAdapter(HTTPAdapter):
+
+    """
+    HTTPAdapter with a bounded connection pool, retries and a default timeout.
+
+    pool_block makes threads wait for a free connection instead of opening
+    (and then discarding) extra ones beyond pool_maxsize.
+    """
+
+    def __init__(self,pool_maxsize=DEFAULT_POOL_SIZE,timeout=DEFAULT_TIMEOUT,max_retries=RETRY):
+
+        self.timeout=timeout
+        super().__init__(pool_connections=len(HOST_POOL_SIZES)+1,pool_maxsize=pool_maxsize,max_retries=max_retries,pool_block=True)
+
+    def send(self,request,**kwargs):
+
+        if kwargs.get('timeout') is None:
+            kwargs['timeout']=self.timeout
+
+        return super().send(request,**kwargs)
+
+
+# Created once, so every session mounting them shares the same connections
+_default_adapter=PooledAdapter()
+_host_adapters={prefix:PooledAdapter(pool_maxsize=size) for prefix,size in HOST_POOL_SIZES.items()}
+
+
+def mount(session):
+
+    # Routes a session (ours or a client library's) through the shared pools
+
+    session.mount('https://',_default_adapter)
+    session.mount('http://',_default_adapter)
+
+    for prefix,adapter in _host_adapters.items():
+        session.mount(prefix,adapter)
+
+    return session
+
+
+# Shared by every module of the process that has no session of its own
+session=mount(requests.Session())
@@ -0,0 +1,141 @@
+# Copyright (c) 2025 Niroojane Selvam
+# Licensed under the MIT License. See LICENSE file in the project root for full license information.
+
+
+#!/usr/bin/env python
+# coding: utf-8
+
+import json
+import time
+import threading
+import requests
+
+from .Http import session
+
+
+class CachedResponse:
+
+    def __init__(self,content,etag=None,last_modified=None):
+
+        self.content=content
+        self.etag=etag
+        self.last_modified=last_modified
+        self.fetched=time.monotonic()
+
+    def json(self):
+
+        return json.loads(self.content)
+
+
+class RevalidatingCache:
+
+    """
+    Per URL locking and conditional GETs shared by HttpCache and ExcelCache.
+
+    One lock per URL makes concurrent callers (e.g. several Streamlit
+    sessions) wait for a single download.
+    """
+
+    def __init__(self,timeout=30):
+
+        self.timeout=timeout
+
+        self._locks={}
+        self._lock=threading.Lock()
+
+    def _url_lock(self,url):
+
+        with self._lock:
+            return self._locks.setdefault(url,threading.Lock())
+
+    def _revalidate(self,url,etag=None,last_modified=None,cached=False,headers=None):
+
+        # GET with If-None-Match / If-Modified-Since from the cached copy's validators.
+        # Returns the response (a 304 only when a copy is cached), or None when the
+        # request failed while a copy is cached: it is served stale rather than
+        # failing the whole page. Without a cached copy errors are raised.
+
+        request_headers=dict(headers or {})
+
+        if etag:
+            request_headers['If-None-Match']=etag
+        if last_modified:
+            request_headers['If-Modified-Since']=last_modified
+
+        try:
+            response=session.get(url,headers=request_headers,timeout=self.timeout)
+
+            if response.status_code==304 and cached:
+                return response
+
+            response.raise_for_status()
+
+        except requests.exceptions.RequestException as e:
+
+            if not cached:
+                raise
+
+            print(f"Revalidation failed for {url}, using cached copy: {e}")
+            return None
+
+        return response
+
+
+class HttpCache(RevalidatingCache):
+
+    """
+    In-process cache of GET responses.
+
+    A response younger than its TTL is served without any request. An older
+    one is revalidated with If-None-Match / If-Modified-Since, and a 304
+    answer only refreshes its timestamp.
+    """
+
+    def __init__(self,timeout=30):
+
+        super().__init__(timeout)
+
+        self._entries={}
+
+    def get(self,url,ttl=300,headers=None):
+
+        with self._url_lock(url):
+
+            entry=self._entries.get(url)
+
+            if entry is not None and time.monotonic()-entry.fetched<ttl:
+                return entry
+
+            if entry is None:
+                response=self._revalidate(url,headers=headers)
+            else:
+                response=self._revalidate(url,entry.etag,entry.last_modified,cached=True,headers=headers)
+
+            if response is None:
+                return entry
+
+            if response.status_code==304:
+                entry.fetched=time.monotonic()
+                return entry
+
+            # A new object only when the body changed, so results derived from it can be keyed on it
+            entry=CachedResponse(
+                response.content,
+                etag=response.headers.get('ETag'),
+                last_modified=response.headers.get('Last-Modified')
+            )
+            self._entries[url]=entry
+
+            return entry
+
+    def clear(self,url=None):
+
+        with self._lock:
+            if url is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(url,None)
+
+
+# Market data responses, e.g. the market caps of BinanceAPI
+http_cache=HttpCache()
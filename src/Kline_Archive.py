@@ -0,0 +1,192 @@
+# Copyright (c) 2025 Niroojane Selvam
+# Licensed under the MIT License. See LICENSE file in the project root for full license information.
+
+
+#!/usr/bin/env python
+# coding: utf-8
+
+# Imports the monthly / daily kline dumps of https://data.binance.vision
+# (e.g. spot/monthly/klines/BTCUSDT/1d/BTCUSDT-1d-2024-01.zip) into the PriceStore:
+#     python -m src.Kline_Archive path/to/archives --interval 1d
+
+import os
+import re
+import argparse
+import zipfile
+import numpy as np
+import pandas as pd
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from .Http import MAX_WORKERS
+from .Price_Store import PriceStore, DEFAULT_PRICE_ROOT
+from .Binance_Async import INTERVAL_MS
+
+
+# <ticker>-<interval>-<YYYY-MM[-DD]>.zip (or the .csv inside it)
+ARCHIVE_NAME=re.compile(r'^(?P<ticker>[A-Z0-9]+)-(?P<interval>\w+)-(?P<period>\d{4}-\d{2}(?:-\d{2})?)\.(?:zip|csv)$')
+
+# Columns of a kline row used here: open time, close, close time
+OPEN_TIME,CLOSE,CLOSE_TIME=0,4,6
+
+CHUNK_ROWS=100_000
+
+# Spot dumps from 2025-01-01 on are stamped in microseconds, older ones in milliseconds
+MICROSECOND_THRESHOLD=10**14
+
+
+def archive_files(directory,interval='1d',tickers=None):
+
+    # {ticker: [archive paths sorted by period]} of the dumps of one interval found under directory
+
+    files={}
+
+    for folder,_,names in os.walk(directory):
+        for name in names:
+
+            match=ARCHIVE_NAME.match(name)
+
+            if match is None or match['interval']!=interval:
+                continue
+            if tickers is not None and match['ticker'] not in tickers:
+                continue
+
+            # An extracted csv next to its zip is read once
+            stem=os.path.splitext(name)[0]
+            files.setdefault(match['ticker'],{}).setdefault((match['period'],stem),os.path.join(folder,name))
+
+    return {ticker:[paths[key] for key in sorted(paths)] for ticker,paths in files.items()}
+
+
+def _csv_streams(path):
+
+    # Binary streams of the csv files of an archive, decompressed lazily as they are read
+
+    if path.endswith('.zip'):
+        with zipfile.ZipFile(path) as archive:
+            for name in archive.namelist():
+                if name.endswith('.csv'):
+                    with archive.open(name) as f:
+                        yield f
+    else:
+        with open(path,'rb') as f:
+            yield f
+
+
+def read_archive(path,interval_ms,chunk_rows=CHUNK_ROWS):
+
+    # Yields (int64 candle index, float64 close) chunk by chunk
+
+    for f in _csv_streams(path):
+
+        reader=pd.read_csv(
+            f,
+            header=None,
+            usecols=[OPEN_TIME,CLOSE,CLOSE_TIME],
+            chunksize=chunk_rows,
+            dtype=str
+        )
+
+        for chunk in reader:
+
+            # Some dumps carry a header row, it does not parse as a number and is dropped
+            valid=pd.to_numeric(chunk[OPEN_TIME],errors='coerce').notna().to_numpy()
+
+            close_time=chunk[CLOSE_TIME].to_numpy()[valid].astype(np.int64)
+            close=chunk[CLOSE].to_numpy()[valid].astype(np.float64)
+
+            close_time=np.where(close_time>=MICROSECOND_THRESHOLD,close_time//1000,close_time)
+
+            # Same candle index as decode_klines: the close time in whole intervals
+            yield close_time//interval_ms,close
+
+
+def import_ticker(store,ticker,paths,interval_ms,chunk_rows=CHUNK_ROWS):
+
+    # Reads every archive of a ticker, checks it and writes it to the store in one go
+
+    chunks=[chunk for path in paths for chunk in read_archive(path,interval_ms,chunk_rows)]
+
+    if not chunks:
+        return {'Ticker':ticker,'Rows':0,'Duplicates':0,'Gaps':0,'Missing':0,'First':None,'Last':None}
+
+    index=np.concatenate([chunk[0] for chunk in chunks])
+    close=np.concatenate([chunk[1] for chunk in chunks])
+
+    # Overlapping dumps (a monthly file and the daily files of the same month) repeat candles,
+    # the one read last wins like in PriceStore.write
+    order=np.argsort(index,kind='stable')
+    index,close=index[order],close[order]
+    last=np.append(index[1:]!=index[:-1],True)
+    duplicates=int(len(index)-last.sum())
+    index,close=index[last],close[last]
+
+    steps=np.diff(index)
+    gaps=int((steps>1).sum())
+    missing=int((steps[steps>1]-1).sum())
+
+    dates=pd.DatetimeIndex((index*interval_ms).astype('datetime64[ms]'))
+    store.write(ticker,pd.Series(close,index=dates))
+
+    return {
+        'Ticker':ticker,
+        'Rows':len(index),
+        'Duplicates':duplicates,
+        'Gaps':gaps,
+        'Missing':missing,
+        'First':dates[0],
+        'Last':dates[-1],
+    }
+
+
+def import_archives(directory,store=None,interval='1d',tickers=None,max_workers=MAX_WORKERS):
+
+    # Imports every dump of `interval` under directory, returns one report row per ticker
+
+    if interval not in INTERVAL_MS:
+        raise ValueError(f"Unsupported interval {interval}, expected one of {list(INTERVAL_MS)}")
+
+    store=store if store is not None else PriceStore(interval=interval)
+    files=archive_files(directory,interval,tickers)
+    reports=[]
+
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+
+        futures={
+            executor.submit(import_ticker,store,ticker,paths,INTERVAL_MS[interval]):ticker
+            for ticker,paths in files.items()
+        }
+
+        for future in as_completed(futures):
+
+            ticker=futures[future]
+
+            try:
+                reports.append(future.result())
+            except Exception as e:
+                print(f"{ticker} not imported: {e}")
+
+    if not reports:
+        return pd.DataFrame(columns=['Rows','Duplicates','Gaps','Missing','First','Last'])
+
+    report=pd.DataFrame(reports).set_index('Ticker').sort_index()
+
+    for ticker,row in report[report['Gaps']>0].iterrows():
+        print(f"{ticker}: {row['Missing']} missing candle(s) in {row['Gaps']} gap(s)")
+
+    return report
+
+
+def main(argv=None):
+
+    parser=argparse.ArgumentParser(description='Import Binance kline archives into the price store')
+    parser.add_argument('directory',help='directory holding the downloaded .zip/.csv dumps')
+    parser.add_argument('--interval',default='1d',choices=list(INTERVAL_MS))
+    parser.add_argument('--root',default=DEFAULT_PRICE_ROOT,help='price store directory')
+    args=parser.parse_args(argv)
+
+    report=import_archives(args.directory,PriceStore(args.root,interval=args.interval),interval=args.interval)
+    print(report.to_string())
+
+
+if __name__=='__main__':
+    main()
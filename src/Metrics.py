@@ -20,10 +20,12 @@ from scipy.stats import norm, chi2,gumbel_l
 from IPython.display import HTML
 from io import BytesIO
 import requests
+from requests.exceptions import RequestException
 import base64
 
 from .RiskMetrics import *
 from .Rebalancing import *
+from .Excel_Cache import excel_cache
 
 def display_scrollable_df(df, max_height="50vh", max_width="90vw"):
     style = f"""
@@ -492,10 +494,8 @@ def get_frontier(returns,dataframe,cons=None):
 
 def read_excel_from_url(url,index_col=None):
         try:
-            response = requests.get(url)
-            response.raise_for_status()  # raises HTTPError for 4xx / 5xx
-    
-            return pd.read_excel(BytesIO(response.content), index_col=index_col)
+            # Revalidated with the server, parsed only when the file changed
+            return excel_cache.read(url, index_col=index_col)  # raises HTTPError for 4xx / 5xx
     
         except requests.exceptions.HTTPError as e:
             # File not found (404) or server error
@@ -0,0 +1,89 @@
+# Copyright (c) 2025 Niroojane Selvam
+# Licensed under the MIT License. See LICENSE file in the project root for full license information.
+
+
+#!/usr/bin/env python
+# coding: utf-8
+
+import os
+import threading
+import numpy as np
+
+
+DEFAULT_MINUTE_ROOT=os.path.join('data','minute_bars')
+
+
+class MinuteBarStore:
+
+    """
+    Append-only cache of 1 minute closes keyed by (ticker, minute).
+
+    Each ticker is kept in two raw files read through memory maps:
+    ``<ticker>.minutes`` with the int64 open minute (open time // 60s) and
+    ``<ticker>.closes`` with the float32 close. Historical bars never change,
+    so new bars are only ever appended.
+    """
+
+    def __init__(self,root=DEFAULT_MINUTE_ROOT):
+
+        self.root=root
+        self._lock=threading.Lock()
+
+    def _paths(self,ticker):
+
+        return (
+            os.path.join(self.root,f'{ticker}.minutes'),
+            os.path.join(self.root,f'{ticker}.closes')
+        )
+
+    def read(self,ticker):
+
+        # (sorted int64 minutes, float32 closes), empty arrays if the ticker is not cached
+
+        minutes_path,closes_path=self._paths(ticker)
+
+        if not os.path.exists(minutes_path) or not os.path.exists(closes_path):
+            return np.empty(0,dtype=np.int64),np.empty(0,dtype=np.float32)
+
+        # A bar only counts once both of its values were written
+        count=min(os.path.getsize(minutes_path)//8,os.path.getsize(closes_path)//4)
+
+        if count==0:
+            return np.empty(0,dtype=np.int64),np.empty(0,dtype=np.float32)
+
+        minutes=np.memmap(minutes_path,dtype=np.int64,mode='r',shape=(count,))
+        closes=np.memmap(closes_path,dtype=np.float32,mode='r',shape=(count,))
+
+        # Appends are sorted chunks, only older backfills make the file unsorted
+        if np.any(minutes[1:]<=minutes[:-1]):
+            minutes,first=np.unique(minutes,return_index=True)
+            closes=closes[first]
+
+        return minutes,closes
+
+    def append(self,ticker,minutes,closes):
+
+        minutes=np.asarray(minutes,dtype=np.int64)
+        closes=np.asarray(closes,dtype=np.float32)
+
+        with self._lock:
+
+            cached,_=self.read(ticker)
+            new=~np.isin(minutes,cached)
+
+            if not new.any():
+                return
+
+            order=np.argsort(minutes[new])
+            minutes_path,closes_path=self._paths(ticker)
+            os.makedirs(self.root,exist_ok=True)
+
+            # Drop a half written bar so both files stay aligned
+            for path,itemsize in ((minutes_path,8),(closes_path,4)):
+                if os.path.exists(path) and os.path.getsize(path)>len(cached)*itemsize:
+                    os.truncate(path,len(cached)*itemsize)
+
+            with open(minutes_path,'ab') as f:
+                minutes[new][order].tofile(f)
+            with open(closes_path,'ab') as f:
+                closes[new][order].tofile(f)
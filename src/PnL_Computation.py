@@ -13,7 +13,7 @@ import pandas as pd
 import requests
 import datetime
 import numpy as np
-from .Binance_API import BinanceAPI
+from .Binance_API import BinanceAPI, MINUTE_MS
 
 
 # In[2]:
@@ -21,12 +21,15 @@ from .Binance_API import BinanceAPI
 
 class PnL:
 
-    def __init__(self,binance_api_key,binance_api_secret):
+    def __init__(self,binance_api_key,binance_api_secret,minute_store=None):
     
         self.binance_api_key=binance_api_key
         self.binance_api_secret=binance_api_secret
         
         self.binance=BinanceAPI(binance_api_key,binance_api_secret)
+
+        # Optional MinuteBarStore, when set only bars missing from it are downloaded
+        self.minute_store=minute_store
         
     def get_trade_in_usdt(self,trade_history):
 
@@ -44,58 +47,13 @@ class PnL:
             trade_history['Total in USDT']=np.nan
             trade_history['Pair Quantity']=np.nan
         
-        trade_price = {}
-        
-        for index in trade_history.index:
-            
-            if pd.isna(trade_history.iloc[index]['Pair Quantity']):
-                
-                market = trade_history.iloc[index]['Market']
-        
-                if market.endswith('USDT'):
-                    ticker = market
-                elif market.endswith('TRY'):
-                    ticker = 'USDT' + market[-3:]
-                else:
-                    ticker = market[-3:] + 'USDT'
-        
-                time_of_trade = trade_history.iloc[index]['Date(UTC)']
-                time_of_trade_stamp = int(time_of_trade.round(freq='min').timestamp() - 60) * 1000
-        
-                price_data_api = self.binance.binance_api.klines(
-                    ticker, interval='1m', startTime=time_of_trade_stamp, limit=2
-                )
-                price_data = pd.DataFrame(price_data_api)
-                numeric_columns = ['Open Time', 'Open', 'High', 'Low', 'Close', 'Volume', 
-                                   'Close Time', 'Quote Asset Volume', 'Number of Trades', 
-                                   'TB Base Volume', 'TB Quote Volume', 'Ignore']
-                price_data.columns = numeric_columns
-                price_data['Close Time'] = pd.to_datetime(price_data['Close Time'], unit='ms')
-        
-                close_prev = float(price_data.iloc[0]["Close"])
-                close_next = float(price_data.iloc[1]["Close"])
-                t_prev = price_data.iloc[0]["Close Time"]
-                t_next = price_data.iloc[1]["Close Time"]
-        
-                total_diff = (t_next - t_prev) / pd.Timedelta(minutes=1)
-                weight_prev = (t_next - time_of_trade) / pd.Timedelta(minutes=1) / total_diff
-                weight_next = (time_of_trade - t_prev) / pd.Timedelta(minutes=1) / total_diff
-        
-                pair_price = close_prev * weight_prev + close_next * weight_next
-        
-                if market.endswith('TRY'):
-                    pair_price = 1 / pair_price
-        
-                trade_price[index] = (time_of_trade, market, pair_price)
+        pending = trade_history.index[trade_history['Pair Quantity'].isna()]
 
-                print(index,trade_price[index][0],trade_price[index][1],trade_price[index][2])
-            else:
-                continue
-                
-        # Merge with trade_history
-        price = pd.DataFrame(trade_price.values(),index=trade_price.keys(),columns=['Time','Market','Pair Price'])
-        
-        trade_history.iloc[price.index,8]=price['Pair Price']
+        if len(pending) > 0:
+            trade_history.loc[pending, 'Pair Price'] = self.get_pair_price(
+                trade_history.loc[pending, 'Market'],
+                trade_history.loc[pending, 'Date(UTC)']
+            )
         
         # Convert to USDT
         trade_history['Price in USDT'] = np.where(
@@ -112,6 +70,87 @@ class PnL:
         return trade_history
 
         
+    def get_minute_closes(self, needed):
+
+        # Same output as BinanceAPI.get_minute_closes, served from the minute store when possible
+
+        if self.minute_store is None:
+            return self.binance.get_minute_closes(needed)
+
+        closes = {}
+        missing = {}
+
+        for ticker, minutes in needed.items():
+
+            cached_minutes, cached_close = self.minute_store.read(ticker)
+            cached = np.isin(minutes, cached_minutes)
+
+            if not cached.all():
+                missing[ticker] = minutes[~cached]
+
+            closes[ticker] = (cached_minutes, cached_close)
+
+        if missing:
+
+            for ticker, (minutes, close) in self.binance.get_minute_closes(missing).items():
+                self.minute_store.append(ticker, minutes, close)
+                closes[ticker] = self.minute_store.read(ticker)
+
+        return closes
+
+    def get_pair_price(self, markets, times):
+        """
+        USDT conversion price of the quote asset of each trade.
+
+        The price is interpolated between the closes of the two minute candles
+        starting one minute before the trade time rounded to the minute.
+        Candles are downloaded in bulk per conversion ticker and all trades are
+        interpolated at once.
+        """
+
+        markets = markets.astype(str)
+
+        tickers = np.where(
+            markets.str.endswith('USDT'),
+            markets,
+            np.where(markets.str.endswith('TRY'), 'USDT' + markets.str[-3:], markets.str[-3:] + 'USDT')
+        )
+
+        trade_ms = times.astype('datetime64[ms]').astype('int64').to_numpy()
+        first_minute = times.dt.round(freq='min').astype('datetime64[ms]').astype('int64').to_numpy() // MINUTE_MS - 1
+
+        needed = {}
+        for ticker in np.unique(tickers):
+            minutes = first_minute[tickers == ticker]
+            needed[ticker] = np.concatenate([minutes, minutes + 1])
+
+        closes = self.get_minute_closes(needed)
+
+        pair_price = np.full(len(markets), np.nan)
+
+        for ticker, (minutes, close) in closes.items():
+
+            rows = np.flatnonzero(tickers == ticker)
+
+            # First two candles opening at or after the first minute, as klines(startTime, limit=2)
+            position = np.searchsorted(minutes, first_minute[rows])
+            valid = position + 1 < len(minutes)
+            rows, position = rows[valid], position[valid]
+
+            t_prev = (minutes[position] + 1) * MINUTE_MS - 1
+            t_next = (minutes[position + 1] + 1) * MINUTE_MS - 1
+
+            total_diff = (t_next - t_prev) / MINUTE_MS
+            weight_prev = (t_next - trade_ms[rows]) / MINUTE_MS / total_diff
+            weight_next = (trade_ms[rows] - t_prev) / MINUTE_MS / total_diff
+
+            close = np.asarray(close, dtype=np.float64)
+            pair_price[rows] = close[position] * weight_prev + close[position + 1] * weight_next
+
+        pair_price = np.where(markets.str.endswith('TRY'), 1 / pair_price, pair_price)
+
+        return pair_price
+
     def get_crypto_traded(self, price):
     
         traded_crypto = set(price['Market'])  # include all trades, BUY and SELL
@@ -0,0 +1,220 @@
+# Copyright (c) 2025 Niroojane Selvam
+# Licensed under the MIT License. See LICENSE file in the project root for full license information.
+
+
+#!/usr/bin/env python
+# coding: utf-8
+
+import os
+import json
+import time
+import hashlib
+import datetime
+import threading
+import numpy as np
+import pandas as pd
+
+from .Stock_Data import get_close
+from .RiskMetrics import RiskAnalysis
+
+
+DEFAULT_PANEL_ROOT=os.path.join('data','panels')
+
+# 'ffill': every day of any source, closes carried over the days a market is shut (equities on weekends)
+# 'intersect': only the days every source traded
+CALENDARS=('ffill','intersect')
+
+# Seconds an aligned panel ending today is reused, closed ranges are reused until the cache is cleared
+PANEL_TTL=300
+
+
+def forward_fill(values):
+
+    # Column wise forward fill of a 2D float array, leading NaNs stay NaN
+
+    rows=np.where(np.isnan(values),-1,np.arange(len(values))[:,None])
+    np.maximum.accumulate(rows,axis=0,out=rows)
+
+    filled=values[np.maximum(rows,0),np.arange(values.shape[1])]
+    filled[rows<0]=np.nan
+
+    return filled
+
+
+class PricePanel:
+
+    """
+    Date x ticker closes of several sources in one float64 array.
+
+    frame() and returns() wrap the cached arrays in DataFrames without
+    copying them, so RiskAnalysis works on the panel's own memory. The arrays
+    are read-only for that reason.
+    """
+
+    def __init__(self,dates,tickers,values):
+
+        self.dates=np.asarray(dates,dtype='datetime64[ns]')
+        self.tickers=list(tickers)
+        self.values=np.ascontiguousarray(values,dtype=np.float64)
+        self.values.flags.writeable=False
+
+        self._returns=None
+
+    def frame(self):
+
+        return pd.DataFrame(self.values,index=pd.DatetimeIndex(self.dates),columns=self.tickers,copy=False)
+
+    def returns(self):
+
+        # Same as frame().pct_change(fill_method=None), computed once
+
+        if self._returns is None:
+            returns=np.full_like(self.values,np.nan)
+            returns[1:]=self.values[1:]/self.values[:-1]-1
+            returns.flags.writeable=False
+            self._returns=returns
+
+        return pd.DataFrame(self._returns,index=pd.DatetimeIndex(self.dates),columns=self.tickers,copy=False)
+
+    def risk_analysis(self):
+
+        return RiskAnalysis(self.returns())
+
+    def save(self,path):
+
+        os.makedirs(os.path.dirname(path),exist_ok=True)
+
+        with open(path+'.tmp','wb') as f:
+            np.savez(f,dates=self.dates.astype(np.int64),tickers=np.array(self.tickers),values=self.values)
+        os.replace(path+'.tmp',path)
+
+    @classmethod
+    def load(cls,path):
+
+        with np.load(path) as data:
+            return cls(data['dates'].astype('datetime64[ns]'),data['tickers'].tolist(),data['values'])
+
+
+def align(sources,calendar='ffill'):
+
+    # [Date x ticker frames] -> PricePanel, every source aligned once on the common calendar
+
+    if calendar not in CALENDARS:
+        raise ValueError(f"Unknown calendar {calendar}, expected one of {CALENDARS}")
+
+    sources=[frame for frame in sources if frame is not None and not frame.empty]
+
+    if not sources:
+        return PricePanel(np.empty(0,dtype='datetime64[ns]'),[],np.empty((0,0)))
+
+    calendars=[pd.to_datetime(frame.index).values.astype('datetime64[ns]') for frame in sources]
+
+    if calendar=='ffill':
+        dates=np.unique(np.concatenate(calendars))
+    else:
+        dates=calendars[0]
+        for days in calendars[1:]:
+            dates=np.intersect1d(dates,days)
+        dates=np.unique(dates)
+
+    tickers=[ticker for frame in sources for ticker in frame.columns]
+    values=np.full((len(dates),len(tickers)),np.nan)
+
+    column=0
+
+    for frame,days in zip(sources,calendars):
+
+        width=frame.shape[1]
+        rows=np.searchsorted(dates,days)
+        kept=(rows<len(dates)) & (dates[np.minimum(rows,len(dates)-1)]==days)
+
+        values[rows[kept],column:column+width]=frame.to_numpy(dtype=np.float64)[kept]
+        column+=width
+
+    if calendar=='ffill':
+        values=forward_fill(values)
+
+    return PricePanel(dates,tickers,values)
+
+
+class PanelBuilder:
+
+    """
+    Builds PricePanels of crypto (BinanceAPI) and equity (yfinance) tickers.
+
+    Aligned panels are cached in memory and under ``<root>/<key>.npz``, the
+    key being the tickers, dates and calendar of the request. A panel ending
+    today is rebuilt after `ttl` seconds since its last close still moves.
+    """
+
+    def __init__(self,binance=None,equity_store=None,root=DEFAULT_PANEL_ROOT,ttl=PANEL_TTL):
+
+        self.binance=binance
+        self.equity_store=equity_store
+        self.root=root
+        self.ttl=ttl
+
+        self._memo={}
+        self._lock=threading.Lock()
+
+    def _key(self,crypto_tickers,equity_tickers,start_date,end_date,calendar):
+
+        request=json.dumps([list(crypto_tickers),list(equity_tickers),str(start_date),str(end_date),calendar])
+
+        return hashlib.sha1(request.encode()).hexdigest()
+
+    def build(self,crypto_tickers=(),equity_tickers=(),start_date=None,end_date=None,calendar='ffill'):
+
+        end_date=end_date or datetime.date.today()
+        start_date=start_date or datetime.date(end_date.year-1,end_date.month,end_date.day)
+
+        key=self._key(crypto_tickers,equity_tickers,start_date,end_date,calendar)
+        path=os.path.join(self.root,f'{key}.npz')
+
+        # A range that ended before today no longer changes
+        max_age=self.ttl if end_date>=datetime.date.today() else float('inf')
+
+        with self._lock:
+
+            memo=self._memo.get(key)
+
+            if memo is not None and time.time()-memo[0]<max_age:
+                return memo[1]
+
+            if os.path.exists(path) and time.time()-os.path.getmtime(path)<max_age:
+                panel=PricePanel.load(path)
+                self._memo[key]=(os.path.getmtime(path),panel)
+                return panel
+
+        sources=[]
+
+        if crypto_tickers:
+
+            crypto=self.binance.get_price_threading(list(crypto_tickers),start_date)
+
+            if crypto is not None:
+                crypto.index=pd.to_datetime(crypto.index)
+                sources.append(crypto.loc[:pd.Timestamp(end_date)])
+
+        if equity_tickers:
+            # get_close excludes its end date
+            sources.append(get_close(list(equity_tickers),start_date,end_date+datetime.timedelta(1),store=self.equity_store))
+
+        panel=align(sources,calendar=calendar)
+        panel.save(path)
+
+        with self._lock:
+            self._memo[key]=(time.time(),panel)
+
+        return panel
+
+    def clear(self):
+
+        with self._lock:
+
+            self._memo.clear()
+
+            if os.path.isdir(self.root):
+                for name in os.listdir(self.root):
+                    if name.endswith('.npz'):
+                        os.remove(os.path.join(self.root,name))
@@ -0,0 +1,207 @@
+# Copyright (c) 2025 Niroojane Selvam
+# Licensed under the MIT License. See LICENSE file in the project root for full license information.
+
+
+#!/usr/bin/env python
+# coding: utf-8
+
+import os
+import time
+import datetime
+import threading
+import pandas as pd
+
+
+DEFAULT_PRICE_ROOT=os.path.join('data','prices')
+
+# Seconds a candle that was still open when written is served before it is downloaded again
+OPEN_CANDLE_TTL=60
+
+
+class PriceStore:
+
+    """
+    Local columnar store of close prices.
+
+    Every (interval, ticker) pair lives in its own Parquet file
+    ``<root>/<interval>/<ticker>.parquet`` holding a single float64 'Close'
+    column indexed by date. The earliest date that was ever requested for a
+    ticker is kept in the file attributes so that tickers listed after the
+    requested start are not downloaded again on every call, and the time the
+    last candle was written so that a closed one is never downloaded again.
+    """
+
+    def __init__(self,root=DEFAULT_PRICE_ROOT,interval='1d'):
+
+        self.root=root
+        self.interval=interval
+
+        self._lock=threading.Lock()
+        self._memo={}
+
+    def path(self,ticker):
+
+        return os.path.join(self.root,self.interval,f'{ticker}.parquet')
+
+    def read(self,ticker):
+
+        # Returns the cached close series of a ticker, or None if nothing is stored
+
+        path=self.path(ticker)
+
+        try:
+            mtime=os.path.getmtime(path)
+        except OSError:
+            return None
+
+        memo=self._memo.get(ticker)
+
+        if memo is not None and memo[0]==mtime:
+            return memo[1]
+
+        frame=pd.read_parquet(path)
+        series=frame['Close']
+        series.attrs=dict(frame.attrs)
+        self._memo[ticker]=(mtime,series)
+
+        return series
+
+    def bounds(self,ticker):
+
+        # (covered from, last date) of a ticker, or (None, None) if it is not stored
+
+        series=self.read(ticker)
+
+        if series is None or series.empty:
+            return None,None
+
+        covered_from=pd.Timestamp(series.attrs.get('covered_from',series.index[0]))
+
+        return covered_from,series.index[-1]
+
+    def missing_start(self,ticker,start_date):
+
+        # First date that has to be downloaded to cover [start_date, today]
+        # The last stored day is always downloaded again since its candle may
+        # still have been open when it was written.
+
+        start=pd.Timestamp(start_date).normalize()
+        covered_from,last=self.bounds(ticker)
+
+        if covered_from is None or covered_from>start:
+            return start
+
+        return last
+
+    def is_current(self,ticker,start_date,max_age=OPEN_CANDLE_TTL,now=None):
+
+        # True when [start_date, now] needs no download: the range is stored and its last
+        # candle either had closed when it was written and is the last closed candle,
+        # or was still open and was written less than max_age seconds ago
+
+        series=self.read(ticker)
+        covered_from,last=self.bounds(ticker)
+
+        if covered_from is None or covered_from>pd.Timestamp(start_date).normalize():
+            return False
+
+        written_at=series.attrs.get('written_at')
+
+        if written_at is None:
+            return False
+
+        now=time.time()*1000 if now is None else now
+        interval_ms=pd.Timedelta(self.interval).value//10**6
+        close_ms=pd.Timestamp(last).value//10**6+interval_ms
+
+        if written_at>=close_ms:
+            # The candle after it is the one still open
+            return now<close_ms+interval_ms
+
+        return now-written_at<max_age*1000
+
+    def write(self,ticker,close,covered_from=None):
+
+        # Merges new closes into the store, new values override stored ones
+
+        close=close.dropna().astype('float64')
+
+        if close.empty:
+            return
+
+        close.index=pd.to_datetime(close.index)
+
+        if self.interval=='1d':
+            close.index=close.index.normalize()
+
+        close=close[~close.index.duplicated(keep='last')]
+        new_dates=close.index
+
+        with self._lock:
+
+            stored=self.read(ticker)
+
+            if stored is not None:
+                previous_from=pd.Timestamp(stored.attrs.get('covered_from',stored.index[0]))
+                close=pd.concat([stored[~stored.index.isin(close.index)],close])
+            else:
+                previous_from=None
+
+            close=close.sort_index()
+            bounds=[date for date in (previous_from,covered_from,close.index[0]) if date is not None]
+
+            frame=pd.DataFrame({'Close':close.values},index=close.index)
+            frame.index.name='Date'
+            frame.attrs['covered_from']=min(pd.Timestamp(date) for date in bounds).strftime('%Y-%m-%d')
+
+            # Only a write of the last candle says whether it was closed
+            if close.index[-1] in new_dates:
+                frame.attrs['written_at']=int(time.time()*1000)
+            elif stored is not None and 'written_at' in stored.attrs:
+                frame.attrs['written_at']=stored.attrs['written_at']
+
+            path=self.path(ticker)
+            os.makedirs(os.path.dirname(path),exist_ok=True)
+
+            temp_path=path+'.tmp'
+            frame.to_parquet(temp_path)
+            os.replace(temp_path,path)
+
+            self._memo.pop(ticker,None)
+
+    def clear(self,ticker):
+
+        # Forgets a ticker, e.g. when its history was revised at the source
+
+        with self._lock:
+
+            if os.path.exists(self.path(ticker)):
+                os.remove(self.path(ticker))
+
+            self._memo.pop(ticker,None)
+
+    def read_panel(self,tickers,start_date=None,end_date=None):
+
+        # Date x ticker panel of the stored closes, tickers without data are left out
+
+        columns={}
+
+        for ticker in tickers:
+
+            series=self.read(ticker)
+
+            if series is not None:
+                columns[ticker]=series
+
+        if not columns:
+            return pd.DataFrame()
+
+        panel=pd.concat(columns,axis=1).sort_index()
+        panel.index.name=None
+
+        if start_date is not None:
+            panel=panel.loc[pd.Timestamp(start_date).normalize():]
+        if end_date is not None:
+            panel=panel.loc[:pd.Timestamp(end_date)]
+
+        return panel
@@ -0,0 +1,185 @@
+# Copyright (c) 2025 Niroojane Selvam
+# Licensed under the MIT License. See LICENSE file in the project root for full license information.
+
+
+#!/usr/bin/env python
+# coding: utf-8
+
+import time
+import atexit
+import weakref
+import datetime
+import threading
+
+
+# Seconds a submission waits for others to join the same publish
+PUBLISH_DEBOUNCE=5.0
+
+PUBLISH_RETRIES=5
+
+# Seconds before the first retry, doubled after every failure
+PUBLISH_BACKOFF=2.0
+
+# Seconds the interpreter waits at exit for the queues to publish what is pending
+EXIT_FLUSH_TIMEOUT=120.0
+
+_queues=weakref.WeakSet()
+
+
+class PublishQueue:
+
+    """
+    Background publisher coalescing repeated saves.
+
+    submit() only records the files (a later version of a file replaces the
+    pending one) and returns at once. A daemon thread waits until no new
+    submission arrived for `debounce` seconds, then calls
+    ``publish(files, message)`` with everything pending. A falsy return or an
+    exception is retried with exponential backoff; files submitted meanwhile
+    are published with the retry. status() can be polled by the UI.
+    """
+
+    def __init__(self,publish,debounce=PUBLISH_DEBOUNCE,max_retries=PUBLISH_RETRIES,backoff=PUBLISH_BACKOFF):
+
+        self.publish=publish
+        self.debounce=debounce
+        self.max_retries=max_retries
+        self.backoff=backoff
+
+        self._pending={}
+        self._message=None
+        self._deadline=None
+        self._state='idle'
+        self._attempts=0
+        self._last_result=None
+        self._last_success=None
+        self._last_error=None
+
+        self._condition=threading.Condition()
+        self._thread=None
+
+        _queues.add(self)
+
+    def submit(self,files,message=None):
+
+        with self._condition:
+
+            self._pending.update(files)
+            self._message=message or self._message
+            self._deadline=time.monotonic()+self.debounce
+
+            if self._state in ('idle','failed'):
+                self._state='pending'
+
+            if self._thread is None or not self._thread.is_alive():
+                self._thread=threading.Thread(target=self._run,name='publish-queue',daemon=True)
+                self._thread.start()
+
+            self._condition.notify_all()
+
+    def status(self):
+
+        with self._condition:
+
+            return {
+                'state':self._state,
+                'pending':sorted(self._pending),
+                'attempts':self._attempts,
+                'last_result':self._last_result,
+                'last_success':self._last_success,
+                'last_error':self._last_error,
+            }
+
+    def flush(self,timeout=None):
+
+        # Publishes what is pending without waiting for the debounce, True once nothing is left
+
+        end=None if timeout is None else time.monotonic()+timeout
+
+        with self._condition:
+
+            self._deadline=time.monotonic()
+            self._condition.notify_all()
+
+            while self._pending or self._state=='publishing':
+
+                remaining=None if end is None else end-time.monotonic()
+
+                if self._state=='failed' or (remaining is not None and remaining<=0):
+                    return False
+
+                self._condition.wait(remaining)
+
+            return self._state!='failed'
+
+    def _run(self):
+
+        while True:
+
+            with self._condition:
+
+                # Wait for the debounce deadline, pushed back by every new submission
+                while not self._pending or time.monotonic()<self._deadline:
+
+                    if not self._pending:
+                        self._condition.wait()
+                    else:
+                        self._condition.wait(self._deadline-time.monotonic())
+
+                files,message=self._pending,self._message
+                self._pending,self._message={},None
+                self._state='publishing'
+
+            try:
+                result=self.publish(files,message)
+                error=None if result else 'publish returned no result'
+            except Exception as e:
+                result,error=None,str(e)
+
+            with self._condition:
+
+                if error is None:
+
+                    self._state='pending' if self._pending else 'idle'
+                    self._attempts=0
+                    self._last_result=result
+                    self._last_success=datetime.datetime.now()
+                    self._last_error=None
+
+                else:
+
+                    self._attempts+=1
+                    self._last_error=error
+
+                    if self._attempts>self.max_retries:
+                        # Dropped, the next submission starts over
+                        print(f"❌ Publishing {', '.join(files)} failed after {self._attempts} attempts: {error}")
+                        self._state='pending' if self._pending else 'failed'
+                        self._attempts=0
+                    else:
+                        # Files submitted meanwhile are newer and win
+                        self._pending={**files,**self._pending}
+                        self._message=self._message or message
+                        self._deadline=time.monotonic()+self.backoff*2**(self._attempts-1)
+                        self._state='retrying'
+
+                self._condition.notify_all()
+
+
+@atexit.register
+def flush_all(timeout=EXIT_FLUSH_TIMEOUT):
+
+    # The publisher thread is a daemon, so a script that queued files and exits
+    # would lose them: every queue with pending work is flushed before the exit
+
+    for queue in list(_queues):
+
+        status=queue.status()
+
+        if not status['pending'] and status['state'] not in ('publishing','retrying'):
+            continue
+
+        # A failed publish was already reported by the queue
+        if not queue.flush(timeout) and queue.status()['state']!='failed':
+            status=queue.status()
+            print(f"❌ Files not published within {timeout:.0f}s of exit: {', '.join(status['pending']) or 'publish in progress'} (last error: {status['last_error']})")
@@ -0,0 +1,98 @@
+# Copyright (c) 2025 Niroojane Selvam
+# Licensed under the MIT License. See LICENSE file in the project root for full license information.
+
+
+#!/usr/bin/env python
+# coding: utf-8
+
+import time
+import asyncio
+import threading
+
+
+# Binance spot REST limit on request weight per IP and per minute
+BINANCE_WEIGHT_PER_MINUTE=6000
+
+# Limit of the /sapi endpoints (account snapshots, wallet)
+SAPI_WEIGHT_PER_MINUTE=12000
+
+
+class WeightBucket:
+
+    """
+    Token bucket counting Binance request weight.
+
+    Tokens refill continuously at capacity/period per second. A caller
+    reserves the weight of its request and sleeps for the returned delay,
+    so concurrent callers queue up instead of overshooting the limit.
+    The bucket is kept in line with the exchange through the
+    X-MBX-USED-WEIGHT-1M response header, and a 429/418 answer blocks
+    every caller until its Retry-After delay has passed.
+    """
+
+    def __init__(self,capacity=BINANCE_WEIGHT_PER_MINUTE,period=60.0,safety=0.9):
+
+        self.capacity=capacity*safety
+        self.rate=self.capacity/period
+
+        self.tokens=self.capacity
+        self.updated=time.monotonic()
+        self.blocked_until=0.0
+
+        self._lock=threading.Lock()
+
+    def _refill(self,now):
+
+        self.tokens=min(self.capacity,self.tokens+(now-self.updated)*self.rate)
+        self.updated=now
+
+    def reserve(self,weight=1):
+
+        # Takes the weight from the bucket and returns how long to wait before sending
+
+        with self._lock:
+
+            now=time.monotonic()
+            self._refill(now)
+            self.tokens-=weight
+
+            wait=max(0.0,-self.tokens/self.rate)
+
+            return max(wait,self.blocked_until-now)
+
+    def acquire(self,weight=1):
+
+        wait=self.reserve(weight)
+
+        if wait>0:
+            time.sleep(wait)
+
+    async def acquire_async(self,weight=1):
+
+        wait=self.reserve(weight)
+
+        if wait>0:
+            await asyncio.sleep(wait)
+
+    def update_used(self,used_weight):
+
+        # Aligns the bucket with the weight the exchange reports as already used
+
+        with self._lock:
+
+            now=time.monotonic()
+            self._refill(now)
+            self.tokens=min(self.tokens,self.capacity-float(used_weight))
+
+    def block(self,seconds):
+
+        with self._lock:
+            self.blocked_until=max(self.blocked_until,time.monotonic()+seconds)
+
+    def update_from_headers(self,headers):
+
+        # requests and aiohttp both expose case-insensitive headers
+        used=headers.get('X-MBX-USED-WEIGHT-1M')
+
+        if used is not None:
+            self.update_used(used)
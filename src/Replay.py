@@ -0,0 +1,409 @@
+# Copyright (c) 2025 Niroojane Selvam
+# Licensed under the MIT License. See LICENSE file in the project root for full license information.
+
+
+#!/usr/bin/env python
+# coding: utf-8
+
+# Record once with live credentials, then replay offline:
+#     adapter=ReplayAdapter(mode='record')
+#     install(adapter,binance=Binance)        # Binance client, GitHub, HTTP and Excel caches
+#     ... run the ingestion / PnL / publish paths ...
+#     adapter=ReplayAdapter(mode='replay',latency=0.05,rate_limit=RateLimitSimulator())
+#     install(adapter,binance=Binance)
+
+import os
+import json
+import time
+import base64
+import random
+import asyncio
+import hashlib
+import threading
+import collections
+import requests
+from urllib.parse import urlsplit, parse_qsl, urlencode
+from requests.adapters import HTTPAdapter
+from requests.structures import CaseInsensitiveDict
+
+from . import Http
+
+
+DEFAULT_FIXTURE_ROOT=os.path.join('data','fixtures')
+
+# Signing parameters change on every call, they are not part of a fixture's identity
+VOLATILE_PARAMS={'timestamp','signature','recvWindow'}
+
+# Parameters a replayed request may differ in from its fixture, per path: when no
+# fixture matches exactly, the one of the same request with the closest values is
+# served (get_positions_history sends endTime=now(), price history a start date
+# relative to today, so exact keys recorded on one day never match on the next)
+NEAREST_PARAMS={
+    '/sapi/v1/accountSnapshot':('startTime','endTime'),
+    '/api/v3/klines':('startTime','endTime'),
+}
+
+# Request weights used by the rate limit simulator, 1 for any other path
+REQUEST_WEIGHTS={
+    '/api/v3/klines':2,
+    '/api/v3/ticker/price':4,
+    '/api/v3/myTrades':20,
+    '/sapi/v1/accountSnapshot':2400,
+}
+
+
+class RateLimitSimulator:
+
+    """
+    Sliding window request weight counter answering 429 like Binance.
+
+    Every replayed response carries X-MBX-USED-WEIGHT-1M, so WeightBucket
+    sees the same headers as against the exchange.
+    """
+
+    def __init__(self,limit=6000,period=60.0,weights=None):
+
+        self.limit=limit
+        self.period=period
+        self.weights=REQUEST_WEIGHTS if weights is None else weights
+
+        self._used=collections.deque()
+        self._total=0
+        self._lock=threading.Lock()
+
+    def consume(self,path):
+
+        # (allowed, used weight, seconds until the request would fit)
+
+        weight=self.weights.get(path,1)
+
+        with self._lock:
+
+            now=time.monotonic()
+
+            while self._used and now-self._used[0][0]>=self.period:
+                self._total-=self._used.popleft()[1]
+
+            if self._total+weight>self.limit:
+                retry_after=self.period-(now-self._used[0][0])
+                return False,self._total,retry_after
+
+            self._used.append((now,weight))
+            self._total+=weight
+
+            return True,self._total,0.0
+
+
+class ReplayAdapter(HTTPAdapter):
+
+    """
+    requests transport serving recorded responses from local fixtures.
+
+    mode='record' sends every request through the adapter the session used
+    before and stores the response under ``<root>/<host>/<key>.json``;
+    mode='replay' only serves fixtures (a missing one is a 404) and
+    mode='auto' replays what exists and records the rest. A URL answered
+    several times keeps its responses in order and replays them in the same
+    order, the last one repeating. A request with no exact fixture falls
+    back to the closest one differing only in the `nearest` parameters of
+    its path (see NEAREST_PARAMS). `latency` (seconds, with an optional
+    seeded `jitter`) and a RateLimitSimulator make offline runs behave like
+    the network for load tests.
+    """
+
+    def __init__(self,root=DEFAULT_FIXTURE_ROOT,mode='replay',latency=0.0,jitter=0.0,rate_limit=None,seed=0,nearest=None):
+
+        super().__init__()
+
+        self.root=root
+        self.mode=mode
+        self.latency=latency
+        self.jitter=jitter
+        self.rate_limit=rate_limit
+        self.nearest=NEAREST_PARAMS if nearest is None else nearest
+
+        self._random=random.Random(seed)
+        self._replayed=collections.Counter()
+        self._inner={}
+        self._fixtures={}
+        self._lock=threading.Lock()
+
+    def key(self,request):
+
+        parts=urlsplit(request.url)
+        query=sorted((name,value) for name,value in parse_qsl(parts.query) if name not in VOLATILE_PARAMS)
+
+        body=request.body or b''
+        body=body.encode() if isinstance(body,str) else body
+
+        identity=f'{request.method} {parts.netloc}{parts.path}?{urlencode(query)} {hashlib.sha1(body).hexdigest()}'
+
+        return parts.netloc,hashlib.sha1(identity.encode()).hexdigest()
+
+    def _host_directory(self,host):
+
+        return os.path.join(self.root,host.replace(':','_'))
+
+    def _path(self,request):
+
+        host,key=self.key(request)
+
+        return os.path.join(self._host_directory(host),f'{key}.json')
+
+    def _split(self,method,url):
+
+        # (method, path, other parameters, {nearest parameter: value}) of a request
+
+        parts=urlsplit(url)
+        names=self.nearest.get(parts.path,())
+        query=[(name,value) for name,value in parse_qsl(parts.query) if name not in VOLATILE_PARAMS]
+
+        values={name:float(value) for name,value in query if name in names}
+        others=tuple(sorted((name,value) for name,value in query if name not in names))
+
+        return method,parts.path,others,values
+
+    def _host_fixtures(self,host):
+
+        # [(method, path, other parameters, nearest values, fixture path)] recorded for a host, read once
+
+        with self._lock:
+
+            if host not in self._fixtures:
+
+                fixtures=[]
+                directory=self._host_directory(host)
+
+                for name in sorted(os.listdir(directory)) if os.path.isdir(directory) else []:
+                    if name.endswith('.json'):
+                        path=os.path.join(directory,name)
+                        entry=self._load(path)[0]
+                        fixtures.append(self._split(entry.get('method','GET'),entry['url'])+(path,))
+
+                self._fixtures[host]=fixtures
+
+            return self._fixtures[host]
+
+    def _nearest_path(self,request):
+
+        # Fixture of the same request whose nearest parameters are the closest, None without one
+
+        method,path,others,values=self._split(request.method,request.url)
+
+        if not values:
+            return None
+
+        candidates=[
+            (sum(abs(fixture[3][name]-value) for name,value in values.items()),fixture[4])
+            for fixture in self._host_fixtures(urlsplit(request.url).netloc)
+            if fixture[:3]==(method,path,others) and fixture[3].keys()==values.keys()
+        ]
+
+        return min(candidates)[1] if candidates else None
+
+    def _load(self,path):
+
+        if not os.path.exists(path):
+            return None
+
+        with open(path) as f:
+            return json.load(f)
+
+    def delay(self):
+
+        with self._lock:
+            return max(0.0,self.latency+self._random.uniform(-self.jitter,self.jitter))
+
+    def _inner_adapter(self,url):
+
+        for prefix,adapter in self._inner.items():
+            if url.lower().startswith(prefix.lower()):
+                return adapter
+
+        return Http.PooledAdapter()
+
+    def _record(self,request,path,**kwargs):
+
+        response=self._inner_adapter(request.url).send(request,**kwargs)
+
+        entry={
+            'method':request.method,
+            'url':request.url,
+            'status':response.status_code,
+            'reason':response.reason,
+            'headers':dict(response.headers),
+            'body':base64.b64encode(response.content).decode(),
+        }
+
+        with self._lock:
+
+            entries=self._load(path) or []
+            entries.append(entry)
+
+            os.makedirs(os.path.dirname(path),exist_ok=True)
+            with open(path+'.tmp','w') as f:
+                json.dump(entries,f)
+            os.replace(path+'.tmp',path)
+
+            # Listed again on the next fallback lookup
+            self._fixtures.pop(urlsplit(request.url).netloc,None)
+
+        return response
+
+    def _build(self,request,status,headers,content,reason=None):
+
+        response=requests.Response()
+        response.status_code=status
+        response.reason=reason or ('OK' if status<400 else 'Error')
+        response.headers=CaseInsensitiveDict(headers)
+        response._content=content
+        response.url=request.url
+        response.request=request
+        response.encoding='utf-8'
+        response.connection=self
+
+        return response
+
+    def respond(self,request,sleep=True):
+
+        # The replayed response of a request, after the simulated latency and rate limit
+
+        if sleep:
+            time.sleep(self.delay())
+
+        headers={}
+
+        if self.rate_limit is not None:
+
+            allowed,used,retry_after=self.rate_limit.consume(urlsplit(request.url).path)
+            headers['X-MBX-USED-WEIGHT-1M']=str(used)
+
+            if not allowed:
+                headers['Retry-After']=str(int(retry_after)+1)
+                body=json.dumps({'code':-1003,'msg':'Too many requests (simulated).'}).encode()
+                return self._build(request,429,headers,body,reason='Too Many Requests')
+
+        path=self._path(request)
+        entries=self._load(path)
+
+        if not entries:
+            path=self._nearest_path(request)
+            entries=self._load(path) if path is not None else None
+
+        if not entries:
+            body=json.dumps({'msg':f'No fixture for {request.method} {request.url}'}).encode()
+            return self._build(request,404,headers,body,reason='Not Found')
+
+        with self._lock:
+            index=min(self._replayed[path],len(entries)-1)
+            self._replayed[path]+=1
+
+        entry=entries[index]
+        headers={**entry['headers'],**headers}
+
+        # The body is stored decoded
+        for name in ('Content-Encoding','Transfer-Encoding','Content-Length'):
+            headers.pop(name,None)
+
+        return self._build(request,entry['status'],headers,base64.b64decode(entry['body']),reason=entry.get('reason'))
+
+    def send(self,request,**kwargs):
+
+        path=self._path(request)
+
+        if self.mode=='record' or (self.mode=='auto' and self._load(path) is None):
+            return self._record(request,path,**kwargs)
+
+        return self.respond(request)
+
+    def mount(self,session):
+
+        # Takes over every prefix of the session, the adapters it replaces are used to record
+
+        for prefix,adapter in list(session.adapters.items()):
+            self._inner.setdefault(prefix,adapter)
+            session.mount(prefix,self)
+
+        return session
+
+    def async_session(self):
+
+        # Stand-in for aiohttp.ClientSession, see AsyncKlineFetcher(session_factory=...)
+        return ReplaySession(self)
+
+
+class ReplayResponse:
+
+    def __init__(self,response):
+
+        self._response=response
+        self.status=response.status_code
+        self.headers=response.headers
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self,*args):
+        return False
+
+    def raise_for_status(self):
+        self._response.raise_for_status()
+
+    async def json(self):
+        return self._response.json()
+
+
+class ReplaySession:
+
+    # The part of aiohttp.ClientSession used by AsyncKlineFetcher, served by a ReplayAdapter
+
+    def __init__(self,adapter):
+
+        self.adapter=adapter
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self,*args):
+        return False
+
+    def get(self,url,params=None):
+
+        return _ReplayRequest(self.adapter,requests.Request('GET',url,params=params).prepare())
+
+
+class _ReplayRequest:
+
+    def __init__(self,adapter,request):
+
+        self.adapter=adapter
+        self.request=request
+        self.response=None
+
+    async def __aenter__(self):
+
+        if self.adapter.mode=='replay':
+            # Simulated latency without holding a thread
+            await asyncio.sleep(self.adapter.delay())
+            response=self.adapter.respond(self.request,sleep=False)
+        else:
+            response=await asyncio.to_thread(self.adapter.send,self.request)
+
+        return ReplayResponse(response)
+
+    async def __aexit__(self,*args):
+        return False
+
+
+def install(adapter,binance=None,sessions=None):
+
+    # Routes the shared session (GitHub, HTTP and Excel caches) and a BinanceAPI through the adapter
+
+    for session in sessions if sessions is not None else [Http.session]:
+        adapter.mount(session)
+
+    if binance is not None:
+        adapter.mount(binance.binance_api.session)
+        binance.async_session_factory=adapter.async_session
+
+    return adapter
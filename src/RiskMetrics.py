@@ -10,10 +10,12 @@ import random
 import numpy as np
 from scipy.stats import norm, chi2,gumbel_l
 import scipy.optimize as sco
+from scipy import linalg
 from scipy.optimize import minimize
 import datetime
 from statsmodels.stats.correlation_tools import cov_nearest
-from joblib import Parallel, delayed
+
+from .Window_Executor import map_windows
 
 
 # # General Functions
@@ -91,22 +93,21 @@ def drawdown_contribution(weighted_returns):
     contribution_to_drawdown=contribution_to_drawdown.ffill()
     return contribution_to_drawdown
 
-def get_var_contribution(func_name, args, returns, weights_series,
-                                 window=252, var_centile=0.05, n_jobs=-1):
+def _var_windows(starts, values, weights, index, columns, func_name, args, window, var_centile):
+
+    # VaR / CVaR rows of the windows starting at `starts`, run in a worker of map_windows.
+    # values are the returns in the column order of the weights, weights[i] the weights
+    # at the last date of the window starting at row i
+
+    results = []
+
+    for i in starts:
 
-    def process_window(i):
-        
         try:
-            subset = returns.iloc[i:i+window]
-            # subset = subset.replace([np.inf, -np.inf], np.nan)
-            # subset = subset.dropna(axis=1)
-
-            weights = weights_series.loc[subset.index[-1]]
-            # weights = weights_series.loc[subset.index[-1], subset.columns]
-            # mask = weights != 0
-            # weights = weights[mask]
-            
-            portfolio = RiskAnalysis(subset.loc[:, weights.index])
+            subset = pd.DataFrame(values[i:i+window], index=index[i:i+window], columns=columns)
+            weights_window = pd.Series(weights[i], index=columns, name=subset.index[-1])
+
+            portfolio = RiskAnalysis(subset)
             func = getattr(portfolio, func_name)
     
             if func_name == 'monte_carlo':
@@ -116,7 +117,7 @@ def get_var_contribution(func_name, args, returns, weights_series,
                 distrib = pd.DataFrame(func(*args),
                                        columns=portfolio.returns.columns)
     
-            distrib = distrib.mul(weights, axis=1)
+            distrib = distrib.mul(weights_window, axis=1)
             distrib['Portfolio'] = distrib.sum(axis=1)
             var= distrib.sort_values(by='Portfolio').iloc[
                 int(distrib.shape[0] * var_centile)
@@ -129,17 +130,27 @@ def get_var_contribution(func_name, args, returns, weights_series,
         except Exception as e:
             print(f"Error at iteration {i}: {e}")
             raise
-            # return (
-            #     subset.index[-1],
-            #     pd.Series(np.nan, index=returns.columns.tolist() + ["Portfolio"]),
-            #     pd.Series(np.nan, index=returns.columns.tolist() + ["Portfolio"]),
-            # )            
-        return subset.index[-1], var, cvar
-
-    results = Parallel(n_jobs=n_jobs, backend="loky")(
-        delayed(process_window)(i)
-        for i in range(returns.shape[0] - window)
-    )
+
+        results.append((subset.index[-1], var, cvar))
+
+    return results
+
+
+def get_var_contribution(func_name, args, returns, weights_series,
+                                 window=252, var_centile=0.05, n_jobs=None):
+
+    # n_jobs=None uses Window_Executor.EXECUTION['n_jobs']
+
+    starts = np.arange(returns.shape[0] - window)
+    columns = weights_series.columns
+
+    # Aligned once here, the workers only receive the two matrices (memory mapped)
+    values = returns.loc[:, columns].to_numpy(dtype=float)
+    weights = weights_series.loc[returns.index[starts + window - 1]].to_numpy(dtype=float)
+
+    results = map_windows(_var_windows, starts, values, weights, n_jobs=n_jobs,
+                          index=returns.index, columns=columns, func_name=func_name, args=args,
+                          window=window, var_centile=var_centile)
 
     dico_results_var = {date: var for date, var, _ in results}
     dico_results_cvar = {date: cvar for date, _, cvar in results}
@@ -150,136 +161,388 @@ def get_var_contribution(func_name, args, returns, weights_series,
     return var_dataframe, cvar_dataframe
 
 
-def get_ex_ante_vol(weights_series, returns, window=252, n_jobs=-1):
+class RollingMoments:
+
+    # Rolling DataFrame.cov() of every window of a returns matrix in O(n²) per step.
+    # For each pair of assets the window keeps the number of rows where both are
+    # observed (count), the sum of each asset over those rows (sums[a, b] sums a
+    # over the rows where b is observed) and the sum of their products (products),
+    # so pairwise missing values give the same covariance as pandas. Moving the
+    # window adds the entering row and removes the leaving one. Every `anchor`
+    # steps the sums are rebuilt from the window, centred on its means, so that
+    # rounding errors do not accumulate. Non finite values count as missing.
+
+    def __init__(self, returns, window=252, anchor=None):
+
+        self.values = np.asarray(returns, dtype=float)
+        self.index = returns.index if isinstance(returns, pd.DataFrame) else None
+        self.columns = returns.columns if isinstance(returns, pd.DataFrame) else None
+        self.window = window
+        self.anchor = anchor or window
+
+        self._end = None
+        self._steps = 0
+
+    def _rows(self, rows):
+
+        observed = np.isfinite(rows)
+        centred = np.where(observed, rows - self._shift, 0.0)
+
+        return centred, observed.astype(float)
+
+    def _rebuild(self, end):
+
+        rows = self.values[end - self.window + 1:end + 1]
+
+        observed = np.isfinite(rows)
+        self._shift = np.where(observed, rows, 0.0).sum(axis=0) / np.maximum(observed.sum(axis=0), 1)
+
+        centred, observed = self._rows(rows)
+
+        self._count = observed.T @ observed
+        self._sums = centred.T @ observed
+        self._products = centred.T @ centred
+
+        self._end = end
+        self._steps = 0
+
+    def _move(self, row, sign):
+
+        centred, observed = self._rows(self.values[row])
+
+        self._count += sign * np.outer(observed, observed)
+        self._sums += sign * np.outer(centred, observed)
+        self._products += sign * np.outer(centred, centred)
+
+    def covariance(self, end):
+
+        # Covariance of the window of rows end - window + 1 .. end
+
+        if end < self.window - 1 or end >= len(self.values):
+            raise IndexError(f"No complete window ends at row {end}")
+
+        if self._end is None or end <= self._end or end - self._end + self._steps > self.anchor:
+            self._rebuild(end)
+        else:
+            for row in range(self._end + 1, end + 1):
+                self._move(row, 1)
+                self._move(row - self.window, -1)
+            self._steps += end - self._end
+            self._end = end
+
+        count = self._count
+
+        with np.errstate(divide='ignore', invalid='ignore'):
+            cov = (self._products - self._sums * self._sums.T / count) / (count - 1)
+
+        cov[count < 2] = np.nan
+
+        return cov
+
+    def covariances(self, ends):
+
+        # (len(ends), n, n) covariances of the windows ending at the given rows
+
+        return np.stack([self.covariance(end) for end in ends]) if len(ends) else np.empty((0,) + self.values.shape[1:] * 2)
+
+
+def risk_window_ends(returns, window):
 
-    def process_window(i):
-        subset = returns.iloc[i:i+window]
-        weights = weights_series.loc[subset.index[-1]]
+    # Last rows of the windows returns.iloc[i:i+window] for i in range(T - window)
+    return np.arange(window - 1, returns.shape[0] - 1)
+
+
+def _rolling_weights(weights_series, returns, window):
+
+    # (date, nonzero weights, their column positions, covariance) of every rolling window
+
+    moments = RollingMoments(returns, window)
+    columns = returns.columns
+
+    for end in risk_window_ends(returns, window):
+
+        date = returns.index[end]
+        weights = weights_series.loc[date]
         weights = weights[weights != 0]
 
-        portfolio_class = RiskAnalysis(subset.loc[:, weights.index])
-        return subset.index[-1], portfolio_class.variance(weights)
+        positions = columns.get_indexer(weights.index)
+
+        if (positions < 0).any():
+            raise KeyError(f"{list(weights.index[positions < 0])} not in returns")
+
+        cov = moments.covariance(end)
+
+        yield date, weights, cov[np.ix_(positions, positions)]
+
 
-    results = Parallel(n_jobs=n_jobs, backend="loky")(
-        delayed(process_window)(i)
-        for i in range(returns.shape[0] - window)
+def _vol_decomposition(weights, cov):
+
+    # Same columns as RiskAnalysis.var_contrib(weights)[0]
+
+    w = weights.to_numpy(dtype=float)
+    vol_contrib = np.outer(w, w) * cov * 252
+
+    # Missing covariances are skipped, like the DataFrame sums of var_contrib
+    portfolio_vol = np.sqrt(np.nansum(vol_contrib))
+    idiosyncratic = np.nan_to_num(np.diag(vol_contrib))
+
+    off_diagonal = vol_contrib.copy()
+    np.fill_diagonal(off_diagonal, 0)
+    correlation = np.nansum(off_diagonal, axis=0)
+
+    contrib = pd.DataFrame(
+        np.column_stack([idiosyncratic + correlation, idiosyncratic, correlation]) / portfolio_vol,
+        index=weights.index,
+        columns=['Vol Contribution', 'Idiosyncratic Risk', 'Correlation']
     )
 
-    dataframe = pd.DataFrame.from_dict(dict(results), orient='index').sort_index()
+    return contrib
+
+
+def get_ex_ante_vol(weights_series, returns, window=252, n_jobs=-1):
+
+    # n_jobs is kept for compatibility, the rolling covariance is sequential
+
+    results = {}
+
+    for date, weights, cov in _rolling_weights(weights_series, returns, window):
+        w = weights.to_numpy(dtype=float)
+        results[date] = np.sqrt(w @ cov @ w) * np.sqrt(252)
+
+    dataframe = pd.DataFrame.from_dict(results, orient='index').sort_index()
 
     return dataframe
-    
-def get_ex_ante_vol_contribution_in_pct(weights_series, returns, window=252, n_jobs=-1):
 
-    def process_window(i):
-        subset=returns.iloc[i:i+window]
-        weights=weights_series.loc[subset.index[-1]]
-        weights=weights[weights != 0]
-        portfolio_class=RiskAnalysis(subset.loc[:,weights.index])
-        return subset.index[-1],portfolio_class.var_contrib_pct(weights)['Vol Contribution in %']
 
-    results = Parallel(n_jobs=n_jobs, backend="loky")(
-        delayed(process_window)(i)
-        for i in range(returns.shape[0] - window)
-    )
-    
-    dataframe = pd.DataFrame.from_dict(dict(results), orient='index').sort_index()
-    dataframe['Total Vol in %']=dataframe.sum(axis=1)
-    
-    return dataframe    
+def batch_ex_ante_vol(weights, covariances):
 
-    
-def get_ex_ante_vol_contribution(weights_series, returns, window=252, n_jobs=-1):
+    # Weight paths (P, T, n) of P portfolios and covariances (T, n, n) -> annualised
+    # vols (P, T) and Euler contributions (P, T, n) summing to the vol.
+    # Zero weights are left out like in get_ex_ante_vol: a missing covariance only
+    # makes the vol missing when both of its assets are held.
 
-    def process_window(i):
-        subset=returns.iloc[i:i+window]
-        weights=weights_series.loc[subset.index[-1]]
-        weights=weights[weights != 0]
-        portfolio_class=RiskAnalysis(subset.loc[:,weights.index])
-        return subset.index[-1],portfolio_class.var_contrib(weights)[0]['Vol Contribution']
+    weights = np.asarray(weights, dtype=float)
+    covariances = np.asarray(covariances, dtype=float)
 
-    results = Parallel(n_jobs=n_jobs, backend="loky")(
-        delayed(process_window)(i)
-        for i in range(returns.shape[0] - window)
-    )
-    
-    dataframe = pd.DataFrame.from_dict(dict(results), orient='index').sort_index()
-    dataframe['Total Vol']=dataframe.sum(axis=1)
-    
-    return dataframe    
+    missing = np.isnan(covariances)
+    held = (weights != 0).astype(float)
 
-def get_correlation_contribution(weights_series, returns, window=252, n_jobs=-1):
+    marginal = np.einsum('tnm,ptm->ptn', np.where(missing, 0.0, covariances), weights)
+    variance = np.einsum('ptn,ptn->pt', weights, marginal)
 
-    def process_window(i):
-        subset=returns.iloc[i:i+window]
-        weights=weights_series.loc[subset.index[-1]]
-        weights=weights[weights != 0]
-        portfolio_class=RiskAnalysis(subset.loc[:,weights.index])
-        return subset.index[-1],portfolio_class.var_contrib(weights)[0]['Correlation']
+    unknown = np.einsum('ptn,tnm,ptm->pt', held, missing.astype(float), held) > 0
+    variance[unknown] = np.nan
 
-    results = Parallel(n_jobs=n_jobs, backend="loky")(
-        delayed(process_window)(i)
-        for i in range(returns.shape[0] - window)
-    )
-    
-    dataframe = pd.DataFrame.from_dict(dict(results), orient='index').sort_index()
-    dataframe['Total Correlation']=dataframe.sum(axis=1)
-    
-    return dataframe 
-    
-def get_idiosyncratic_contribution(weights_series, returns, window=252, n_jobs=-1):
+    vol = np.sqrt(variance * 252)
 
-    def process_window(i):
-        subset=returns.iloc[i:i+window]
-        weights=weights_series.loc[subset.index[-1]]
-        weights=weights[weights != 0]
-        portfolio_class=RiskAnalysis(subset.loc[:,weights.index])
-        return subset.index[-1],portfolio_class.var_contrib(weights)[0]['Idiosyncratic Risk']
+    with np.errstate(divide='ignore', invalid='ignore'):
+        contributions = weights * marginal * 252 / vol[..., None]
+
+    contributions[vol == 0] = 0
+
+    return vol, contributions
+
+
+def get_ex_ante_vol_batch(weights_paths, returns, window=252, chunk=256):
+
+    # {name: weights_series} over the same returns -> (vols, contributions): one vol column
+    # per name, equal to get_ex_ante_vol, and {name: date x asset Euler contributions}.
+    # The window covariances are computed once for every portfolio, `chunk` windows
+    # at a time so that the (T, n, n) tensor is never held whole.
+
+    names = list(weights_paths)
+    columns = returns.columns
+    ends = risk_window_ends(returns, window)
+    dates = returns.index[ends].rename(None)
+
+    if not names:
+        return pd.DataFrame(index=dates), {}
+
+    paths = []
+
+    for name in names:
+
+        weights = weights_paths[name].loc[dates]
+        outside = weights.columns.difference(columns)
+
+        if (weights[outside] != 0).any().any():
+            raise KeyError(f"{list(outside)} not in returns")
+
+        paths.append(weights.reindex(columns=columns, fill_value=0.0).to_numpy(dtype=float))
+
+    paths = np.stack(paths)
+
+    moments = RollingMoments(returns, window)
+    vol = np.empty(paths.shape[:2])
+    contributions = np.empty(paths.shape)
+
+    for start in range(0, len(ends), chunk):
+        block = slice(start, start + chunk)
+        vol[:, block], contributions[:, block] = batch_ex_ante_vol(paths[:, block], moments.covariances(ends[block]))
+
+    vols = pd.DataFrame(vol.T, index=dates, columns=names)
+    contributions = {name: pd.DataFrame(contributions[p], index=dates, columns=columns) for p, name in enumerate(names)}
+
+    return vols, contributions
+
+
+def get_vol_decomposition(weights_series, returns, window=252, n_jobs=-1):
+
+    # Rolling vol, idiosyncratic, correlation and % contributions from a single pass,
+    # each frame identical to the one of the dedicated function below
+
+    vol, idiosyncratic, correlation, pct = {}, {}, {}, {}
+
+    for date, weights, cov in _rolling_weights(weights_series, returns, window):
+
+        contrib = _vol_decomposition(weights, cov)
+
+        vol[date] = contrib['Vol Contribution']
+        idiosyncratic[date] = contrib['Idiosyncratic Risk']
+        correlation[date] = contrib['Correlation']
+
+        contrib_pct = contrib / contrib['Vol Contribution'].sum()
+        contrib_pct = contrib_pct.loc[(contrib_pct != 0).any(axis=1)]
+        pct[date] = contrib_pct['Vol Contribution'].sort_values(ascending=False).rename('Vol Contribution in %')
+
+    frames = []
+
+    for results, total in ((vol, 'Total Vol'), (idiosyncratic, 'Total Idiosyncratic Vol'),
+                           (correlation, 'Total Correlation'), (pct, 'Total Vol in %')):
+        dataframe = pd.DataFrame.from_dict(results, orient='index').sort_index()
+        dataframe[total] = dataframe.sum(axis=1)
+        frames.append(dataframe)
+
+    return tuple(frames)
+
+
+def get_ex_ante_vol_contribution_in_pct(weights_series, returns, window=252, n_jobs=-1):
+
+    return get_vol_decomposition(weights_series, returns, window)[3]
 
-    results = Parallel(n_jobs=n_jobs, backend="loky")(
-        delayed(process_window)(i)
-        for i in range(returns.shape[0] - window)
-    )
     
-    dataframe = pd.DataFrame.from_dict(dict(results), orient='index').sort_index()
-    dataframe['Total Idiosyncratic Vol']=dataframe.sum(axis=1)
+def get_ex_ante_vol_contribution(weights_series, returns, window=252, n_jobs=-1):
+
+    return get_vol_decomposition(weights_series, returns, window)[0]
+
+def get_correlation_contribution(weights_series, returns, window=252, n_jobs=-1):
+
+    return get_vol_decomposition(weights_series, returns, window)[2]
     
-    return dataframe
+def get_idiosyncratic_contribution(weights_series, returns, window=252, n_jobs=-1):
+
+    return get_vol_decomposition(weights_series, returns, window)[1]
     
 
-def first_pca_over_time(returns, window=252, n_jobs=-1):
+class RollingPCA:
+
+    # Variance explained by the top k principal components of every complete window.
+    # The window covariances come from RollingMoments and the leading eigenvectors
+    # are found by subspace iteration started from those of the previous window,
+    # which differ by one observation. The iteration stops once the top k
+    # eigenvalues change by less than `tol` (relative) and gives up after max_iter
+    # steps; when `max_fallbacks` windows in a row give up (no dominant factors, so
+    # the warm start does not help) the remaining windows are solved directly.
+    # Direct solves compute only the leading eigenpairs. Small matrices and windows
+    # with pairwise missing values (whose covariance may not be positive
+    # semi-definite) are always solved directly. The share of variance is
+    # eigenvalue / trace, missing covariances give NaN.
+
+    def __init__(self, returns, window=252, k=1, tol=1e-10, max_iter=5, max_fallbacks=3):
 
-    def process_window(i):
-        temp = returns.iloc[i:i+window]
+        self.returns = returns
+        self.window = window
+        self.k = min(k, returns.shape[1])
+        self.tol = tol
+        self.max_iter = max_iter
+        self.max_fallbacks = max_fallbacks
 
-        # skip incomplete window
-        if temp.shape[0] < window:
-            return None
+        n = returns.shape[1]
+        self.block = min(n, 2 * self.k + 2)
 
-        index = temp.index[-1]
+        self._moments = RollingMoments(returns, window)
+        self._basis = None
+        self._fallbacks = 0
 
-        cov_matrix = temp.cov()
-        eig_val, _ = np.linalg.eigh(cov_matrix)
+    def _exact(self, cov):
+
+        n = cov.shape[0]
+        eig_val, eig_vec = linalg.eigh(cov, subset_by_index=[n - self.block, n - 1])
 
         # sort descending
-        eig_val = eig_val[::-1]
+        eig_val, eig_vec = eig_val[::-1], eig_vec[:, ::-1]
 
-        variance_explained = eig_val / eig_val.sum()
+        self._basis = eig_vec
 
-        return index, variance_explained[0]
+        return eig_val[:self.k]
 
-    results = Parallel(n_jobs=n_jobs, backend="loky")(
-        delayed(process_window)(i)
-        for i in range(returns.shape[0])
-    )
+    def _iterate(self, cov):
 
-    # remove None results
-    results = [r for r in results if r is not None]
+        basis = self._basis
+        previous = None
 
-    dico = dict(results)
-    dataframe = pd.DataFrame.from_dict(dico, orient='index').sort_index()
+        for _ in range(self.max_iter):
 
-    return dataframe
+            product = cov @ basis
+            eig_val, rotation = np.linalg.eigh(basis.T @ product)
+            eig_val, rotation = eig_val[::-1][:self.k], rotation[:, ::-1]
+
+            if previous is not None and np.abs(eig_val - previous).max() <= self.tol * abs(eig_val[0]):
+                self._basis = basis @ rotation
+                self._fallbacks = 0
+                return eig_val
+
+            previous = eig_val
+            basis, _ = np.linalg.qr(product @ rotation)
+
+        self._fallbacks += 1
+
+        return self._exact(cov)
+
+    def eigenvalues(self, end):
+
+        # Top k eigenvalues of the covariance of the window ending at row `end`, descending
+
+        cov = self._moments.covariance(end)
+        count = self._moments._count
+
+        if np.isnan(cov).any():
+            self._basis = None
+            return np.full(self.k, np.nan), np.nan
+
+        trace = np.trace(cov)
+
+        if (self._basis is None or self._fallbacks >= self.max_fallbacks or self.block * 2 > cov.shape[0]
+                or count.min() < count.max() or trace <= 0):
+            return self._exact(cov), trace
+
+        return self._iterate(cov), trace
+
+    def variance_explained(self):
+
+        # Date x component share of variance of the windows ending at rows window - 1 .. T - 1
+
+        ends = np.arange(self.window - 1, self.returns.shape[0])
+
+        if not len(ends):
+            return pd.DataFrame()
+
+        explained = np.empty((len(ends), self.k))
+
+        with np.errstate(divide='ignore', invalid='ignore'):
+            for row, end in enumerate(ends):
+                eig_val, trace = self.eigenvalues(end)
+                explained[row] = eig_val / trace
+
+        return pd.DataFrame(explained, index=self.returns.index[ends].rename(None))
+
+
+def first_pca_over_time(returns, window=252, n_jobs=None, k=1):
+
+    # Complete windows only. n_jobs is kept for compatibility, the warm started
+    # iteration goes through the windows in order
+
+    return RollingPCA(returns, window, k).variance_explained()
 
     
 def halton_sequences(number,base=2):
@@ -0,0 +1,115 @@
+# Copyright (c) 2025 Niroojane Selvam
+# Licensed under the MIT License. See LICENSE file in the project root for full license information.
+
+
+#!/usr/bin/env python
+# coding: utf-8
+
+# Collects the daily Binance account snapshot into the local SnapshotStore.
+#
+# From cron (once a day, after the 00:00 UTC snapshot):
+#     30 0 * * * cd /path/to/Risk-Management && python -m src.Snapshot_Collector --once
+#
+# As a long-lived process:
+#     python -m src.Snapshot_Collector --at 00:30
+
+import os
+import time
+import argparse
+import datetime
+
+from .Binance_API import BinanceAPI, SNAPSHOT_WINDOW_DAYS
+from .Price_Store import PriceStore
+from .Snapshot_Store import SnapshotStore, account_root
+
+
+def collect_snapshot(binance,store,days=SNAPSHOT_WINDOW_DAYS):
+
+    # Appends the snapshots of the last `days` days that are newer than the store
+
+    today=datetime.date.today()
+    positions,quantities=binance.get_positions_history_range(today-datetime.timedelta(days-1),today)
+
+    if quantities.empty:
+        print("No snapshot collected")
+        return 0
+
+    last_date=store.last_date('quantities')
+
+    if last_date is not None:
+        positions=positions.loc[positions.index>last_date]
+        quantities=quantities.loc[quantities.index>last_date]
+
+    store.append('positions',positions)
+    store.append('quantities',quantities)
+
+    print(f"{len(quantities)} snapshot(s) collected")
+
+    return len(quantities)
+
+
+def seconds_until(at):
+
+    # Seconds until the next UTC time of day `at` ('HH:MM')
+
+    hour,minute=(int(value) for value in at.split(':'))
+    now=datetime.datetime.now(datetime.timezone.utc)
+    next_run=now.replace(hour=hour,minute=minute,second=0,microsecond=0)
+
+    if next_run<=now:
+        next_run+=datetime.timedelta(days=1)
+
+    return (next_run-now).total_seconds()
+
+
+def run(binance,store,at='00:30',once=False):
+
+    while True:
+
+        try:
+            collect_snapshot(binance,store)
+        except Exception as e:
+            print(f"❌ Snapshot collection failed: {e}")
+
+            # Under cron the exit status is the only trace of a missed day
+            if once:
+                raise
+
+        if once:
+            return
+
+        time.sleep(seconds_until(at))
+
+
+def load_keys():
+
+    api_key=os.environ.get('BINANCE_API_KEY')
+    api_secret=os.environ.get('BINANCE_SECRET_KEY')
+
+    if api_key and api_secret:
+        return api_key,api_secret
+
+    from keys import binance_api_key, binance_api_secret
+
+    return binance_api_key,binance_api_secret
+
+
+def main(argv=None):
+
+    parser=argparse.ArgumentParser(description='Collect the daily Binance account snapshot')
+    parser.add_argument('--once',action='store_true',help='collect once and exit (cron)')
+    parser.add_argument('--at',default='00:30',help='UTC time of the daily collection (HH:MM)')
+    parser.add_argument('--root',default=None,help='snapshot store directory (default: the directory of the account under data/snapshots)')
+    args=parser.parse_args(argv)
+
+    api_key,api_secret=load_keys()
+
+    binance=BinanceAPI(api_key,api_secret,price_store=PriceStore())
+    # The store the Streamlit app opens for the same account
+    store=SnapshotStore(args.root if args.root else account_root(api_key))
+
+    run(binance,store,at=args.at,once=args.once)
+
+
+if __name__=='__main__':
+    main()
@@ -0,0 +1,341 @@
+# Copyright (c) 2025 Niroojane Selvam
+# Licensed under the MIT License. See LICENSE file in the project root for full license information.
+
+
+#!/usr/bin/env python
+# coding: utf-8
+
+import os
+import json
+import glob
+import hashlib
+import datetime
+import threading
+import numpy as np
+import pandas as pd
+
+
+DEFAULT_SNAPSHOT_ROOT=os.path.join('data','snapshots')
+
+TRADES='trades'
+TRADE_DATE='Date(UTC)'
+
+TRADE_SCHEMA={
+    'Date(UTC)':'datetime64[ns]',
+    'Market':'object',
+    'Type':'object',
+    'Price':'float64',
+    'Amount':'float64',
+    'Total':'float64',
+    'Fee':'float64',
+    'Fee Coin':'object',
+    'Pair Price':'float64',
+    'Price in USDT':'float64',
+    'Total in USDT':'float64',
+    'Pair Quantity':'float64',
+}
+
+# A trade is identified by these columns, the last written version wins. Fills
+# identical on all of them (partial fills against several makers in the same
+# second) are told apart by their rank among the identical rows of a write
+TRADE_OCCURRENCE='Occurrence'
+TRADE_KEYS=['Date(UTC)','Market','Type','Price','Amount',TRADE_OCCURRENCE]
+
+# Workbooks of the repository, the sources of the default store of an account
+DEFAULT_SOURCES={
+    'positions':'https://github.com/niroojane/Risk-Management/raw/refs/heads/main/Positions.xlsx',
+    'quantities':'https://github.com/niroojane/Risk-Management/raw/refs/heads/main/Quantities.xlsx',
+    TRADES:'https://github.com/niroojane/Risk-Management/raw/refs/heads/main/Trade%20History%20Reconstructed.xlsx',
+}
+
+EXCEL_FILES={
+    'positions':'Positions.xlsx',
+    'quantities':'Quantities.xlsx',
+    TRADES:'Trade History Reconstructed.xlsx',
+}
+
+
+class SnapshotStore:
+
+    """
+    Append-only Parquet store of positions, quantities and trades.
+
+    Every dataset is partitioned by month:
+    ``<root>/<dataset>/month=YYYY-MM/part-<timestamp>.parquet``.
+    Date x ticker datasets ('positions', 'quantities') are kept in long
+    format (Date, Ticker, Value), trades with the typed columns of
+    TRADE_SCHEMA. Reading keeps the last written version of every row, so
+    appending a day or a trade again simply replaces it. Days appended again
+    with unchanged values are skipped, and every write folds its month back
+    into a single part file.
+    """
+
+    def __init__(self,root=DEFAULT_SNAPSHOT_ROOT):
+
+        self.root=root
+        self._lock=threading.Lock()
+
+    def _partitions(self,dataset,start=None,end=None):
+
+        partitions=sorted(glob.glob(os.path.join(self.root,dataset,'month=*')))
+
+        # Partition names sort like their month, so the range can be checked on the names
+        if start is not None:
+            first=f"month={pd.Timestamp(start).strftime('%Y-%m')}"
+            partitions=[p for p in partitions if os.path.basename(p)>=first]
+        if end is not None:
+            last=f"month={pd.Timestamp(end).strftime('%Y-%m')}"
+            partitions=[p for p in partitions if os.path.basename(p)<=last]
+
+        return partitions
+
+    def _write(self,dataset,rows,date_column):
+
+        stamp=datetime.datetime.now(datetime.timezone.utc).strftime('%Y%m%dT%H%M%S%f')
+
+        with self._lock:
+
+            for month,part in rows.groupby(rows[date_column].dt.strftime('%Y-%m')):
+
+                directory=os.path.join(self.root,dataset,f'month={month}')
+                os.makedirs(directory,exist_ok=True)
+
+                path=os.path.join(directory,f'part-{stamp}.parquet')
+                part.to_parquet(path+'.tmp',index=False)
+                os.replace(path+'.tmp',path)
+
+                # The month is folded back into one part, so a partition never piles up files
+                self._compact_partition(directory,self._keys(dataset))
+
+    def _read_rows(self,partitions,keys):
+
+        parts=[
+            part
+            for partition in partitions
+            for part in sorted(glob.glob(os.path.join(partition,'part-*.parquet')))
+        ]
+
+        if not parts:
+            return None
+
+        # Part names sort chronologically, so keep='last' keeps the latest write
+        frames=[pd.read_parquet(part) for part in parts]
+        rows=pd.concat(frames,ignore_index=True)
+
+        if TRADE_OCCURRENCE in keys:
+            # Parts written before fills were ranked hold one row per key
+            occurrence=rows[TRADE_OCCURRENCE] if TRADE_OCCURRENCE in rows.columns else pd.Series(0,index=rows.index)
+            rows[TRADE_OCCURRENCE]=occurrence.fillna(0).astype('int64')
+
+        if keys==['Date','Ticker']:
+
+            # A day written again replaces the whole day, tickers left out of it included
+            written=np.repeat(np.arange(len(parts)),[len(frame) for frame in frames])
+            rows=rows[written==pd.Series(written).groupby(rows['Date'].values).transform('max').values]
+
+        return rows.drop_duplicates(subset=keys,keep='last')
+
+    def _keys(self,dataset):
+
+        return TRADE_KEYS if dataset==TRADES else ['Date','Ticker']
+
+    def _date_column(self,dataset):
+
+        return TRADE_DATE if dataset==TRADES else 'Date'
+
+    def append(self,dataset,frame):
+
+        # Date x ticker frame, e.g. positions or quantities
+
+        if frame is None or frame.empty:
+            return
+
+        long=frame.copy()
+        long.index=pd.to_datetime(long.index).normalize()
+        long.index.name='Date'
+        long.columns.name='Ticker'
+
+        long=long.stack().rename('Value').reset_index().dropna(subset=['Value'])
+        long['Ticker']=long['Ticker'].astype(str)
+        long['Value']=long['Value'].astype('float64')
+        long=long.drop_duplicates(subset=['Date','Ticker'],keep='last')
+
+        if long.empty:
+            return
+
+        # Days already stored with the same values are not written again
+        stored=self.read(dataset,long['Date'].min(),long['Date'].max())
+
+        if not stored.empty:
+
+            new=long.pivot(index='Date',columns='Ticker',values='Value')
+            columns=new.columns.union(stored.columns)
+            old=stored.reindex(index=new.index,columns=columns)
+            new=new.reindex(columns=columns)
+
+            unchanged=((new==old)|(new.isna() & old.isna())).all(axis=1) & new.index.isin(stored.index)
+            long=long[~long['Date'].isin(new.index[unchanged])]
+
+            if long.empty:
+                return
+
+        self._write(dataset,long,'Date')
+
+    def read(self,dataset,start=None,end=None):
+
+        # Date x ticker frame of the days in [start, end]
+
+        long=self._read_rows(self._partitions(dataset,start,end),['Date','Ticker'])
+
+        if long is None or long.empty:
+            return pd.DataFrame()
+
+        if start is not None:
+            long=long[long['Date']>=pd.Timestamp(start)]
+        if end is not None:
+            long=long[long['Date']<=pd.Timestamp(end)]
+
+        # Tickers keep the order in which they were first written
+        frame=long.pivot(index='Date',columns='Ticker',values='Value').sort_index()
+        frame=frame[pd.unique(long.sort_values(by='Date',kind='stable')['Ticker'])]
+        frame.index.name=None
+        frame.columns.name=None
+
+        return frame
+
+    def append_trades(self,trades):
+
+        if trades is None or trades.empty:
+            return
+
+        trades=trades.reset_index() if TRADE_DATE not in trades.columns else trades.reset_index(drop=True)
+        trades=trades.astype({col:dtype for col,dtype in TRADE_SCHEMA.items() if col in trades.columns})
+        trades[TRADE_OCCURRENCE]=trades.groupby(TRADE_KEYS[:-1],dropna=False).cumcount()
+
+        self._write(TRADES,trades,TRADE_DATE)
+
+    def read_trades(self,start=None,end=None):
+
+        trades=self._read_rows(self._partitions(TRADES,start,end),TRADE_KEYS)
+
+        if trades is None or trades.empty:
+            return pd.DataFrame()
+
+        if start is not None:
+            trades=trades[trades[TRADE_DATE]>=pd.Timestamp(start)]
+        if end is not None:
+            trades=trades[trades[TRADE_DATE]<=pd.Timestamp(end)]
+
+        trades=trades.drop(columns=TRADE_OCCURRENCE)
+
+        return trades.sort_values(by=TRADE_DATE,ascending=False,kind='stable').reset_index(drop=True)
+
+    def last_date(self,dataset):
+
+        partitions=self._partitions(dataset)
+
+        if not partitions:
+            return None
+
+        rows=self._read_rows(partitions[-1:],self._keys(dataset))
+
+        return None if rows is None or rows.empty else rows[self._date_column(dataset)].max()
+
+    def _compact_partition(self,partition,keys):
+
+        parts=sorted(glob.glob(os.path.join(partition,'part-*.parquet')))
+
+        if len(parts)<2:
+            return
+
+        rows=self._read_rows([partition],keys)
+
+        # Named after the newest part so it still sorts after older writes
+        path=parts[-1]
+        rows.to_parquet(path+'.tmp',index=False)
+
+        for part in parts:
+            os.remove(part)
+
+        os.replace(path+'.tmp',path)
+
+    def compact(self,dataset):
+
+        # Rewrites every month holding several part files as a single part,
+        # only needed for stores written before append() folded its month
+
+        with self._lock:
+            for partition in self._partitions(dataset):
+                self._compact_partition(partition,self._keys(dataset))
+
+    def is_empty(self,dataset):
+
+        return not self._partitions(dataset)
+
+    def _sources_path(self):
+
+        return os.path.join(self.root,'sources.json')
+
+    def sources(self):
+
+        # {dataset: {'url': ..., 'version': ...}} of the workbooks imported into the store
+
+        path=self._sources_path()
+
+        if not os.path.exists(path):
+            return {}
+
+        with open(path) as f:
+            return json.load(f)
+
+    def set_source(self,dataset,url,version):
+
+        with self._lock:
+
+            sources=self.sources()
+            sources[dataset]={'url':url,'version':version}
+
+            os.makedirs(self.root,exist_ok=True)
+            with open(self._sources_path()+'.tmp','w') as f:
+                json.dump(sources,f)
+            os.replace(self._sources_path()+'.tmp',self._sources_path())
+
+
+def account_root(api_key,sources=None,root=DEFAULT_SNAPSHOT_ROOT):
+
+    # Store directory of a Binance account and the workbooks seeding it, so that accounts
+    # (and different workbooks) are never mixed. With the repository workbooks (the
+    # default) it only depends on the account, like the store of the collector.
+
+    sources=dict(DEFAULT_SOURCES if sources is None else sources)
+    identity=[api_key] if sources==DEFAULT_SOURCES else [api_key,sorted(sources.items())]
+
+    return os.path.join(root,hashlib.sha1(json.dumps(identity).encode()).hexdigest()[:16])
+
+
+def import_excel(store,dataset,source):
+
+    # Loads Positions.xlsx, Quantities.xlsx or the trade history into the store,
+    # from a path, a URL or the frame already read from one of them
+
+    if dataset==TRADES:
+        frame=source if isinstance(source,pd.DataFrame) else pd.read_excel(source)
+        store.append_trades(frame)
+    else:
+        frame=source.copy() if isinstance(source,pd.DataFrame) else pd.read_excel(source,index_col=0)
+        frame.index=pd.to_datetime(frame.index)
+        store.append(dataset,frame)
+
+
+def export_excel(store,dataset,path=None):
+
+    # Writes a dataset back to the Excel layout of the original files
+
+    path=path or EXCEL_FILES[dataset]
+
+    if dataset==TRADES:
+        store.read_trades().to_excel(path,index=False,engine='openpyxl')
+    else:
+        store.read(dataset).to_excel(path,index=True,engine='openpyxl')
+
+    return path
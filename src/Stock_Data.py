@@ -8,12 +8,15 @@
 # In[1]:
 
 
+import os
 import pandas as pd
 import numpy as np
 import yfinance as yf
 import datetime
 from concurrent.futures import ThreadPoolExecutor, as_completed
 
+DEFAULT_EQUITY_ROOT = os.path.join('data', 'equities')
+
 def fetch_ticker(ticker, start, end):
     try:
         yahoo_data = yf.Ticker(ticker)
@@ -30,29 +33,97 @@ def fetch_ticker(ticker, start, end):
         return None
 
 
+def align_closes(closes, tickers):
+
+    # {ticker: close series} -> Date x ticker panel, filled once instead of concatenated ticker by ticker
+
+    tickers = [ticker for ticker in tickers if ticker in closes]
+
+    if not tickers:
+        return pd.DataFrame()
+
+    dates = np.unique(np.concatenate([closes[ticker].index.values for ticker in tickers]))
+    values = np.full((len(dates), len(tickers)), np.nan)
+
+    for column, ticker in enumerate(tickers):
+        close = closes[ticker]
+        values[np.searchsorted(dates, close.index.values), column] = close.to_numpy(dtype=float)
+
+    return pd.DataFrame(values, index=pd.DatetimeIndex(dates, name='Date'), columns=tickers)
+
+
+def update_ticker(store, ticker, start, end):
+
+    # Downloads the days of [start, end) the store does not hold yet
+    # Returns False when the download failed
+
+    start = pd.Timestamp(start).normalize()
+    fetch_start = store.missing_start(ticker, start)
+    covered_from, last = store.bounds(ticker)
+
+    # The close of a day needs the next day's dividend, so the newest day Yahoo returns
+    # (the last business day before end) is never stored: the store is up to date
+    # once it holds the business day before that one
+    newest = pd.Timestamp(end).normalize() - pd.offsets.BDay(2)
+
+    if covered_from is not None and fetch_start == last and last >= newest:
+        return True
+
+    new = fetch_ticker(ticker, fetch_start.date(), end)
+
+    if new is None:
+        return False
+
+    new = new[ticker]
+
+    # Yahoo back-adjusts the whole history on a new dividend or split,
+    # a different close on the overlapping day means the stored closes are stale
+    if fetch_start == last and last in new.index and not np.isclose(new[last], store.read(ticker)[last], rtol=1e-6):
+        store.clear(ticker)
+        return update_ticker(store, ticker, min(start, covered_from), end)
+
+    store.write(ticker, new, covered_from=start if fetch_start <= start else None)
+
+    return True
+
+
 def get_close(
     tickers,
     start=datetime.date(datetime.date.today().year - 1,
                         datetime.date.today().month,
                         datetime.date.today().day),
     end=datetime.date.today(),
-    max_workers=10
+    max_workers=10,
+    store=None
 ):
-    data = pd.DataFrame()
+    # With a PriceStore (e.g. PriceStore(DEFAULT_EQUITY_ROOT)) only the missing days are downloaded
+
+    closes = {}
 
     with ThreadPoolExecutor(max_workers=max_workers) as executor:
-        futures = {
-            executor.submit(fetch_ticker, ticker, start, end): ticker
-            for ticker in tickers
-        }
+
+        if store is None:
+            futures = {
+                executor.submit(fetch_ticker, ticker, start, end): ticker
+                for ticker in tickers
+            }
+        else:
+            futures = {
+                executor.submit(update_ticker, store, ticker, start, end): ticker
+                for ticker in tickers
+            }
 
         for future in as_completed(futures):
             result = future.result()
 
-            if result is not None:
-                data = pd.concat([data, result], axis=1)
-
-    return data
+            if store is None and result is not None:
+                closes[futures[future]] = result[futures[future]]
 
+    if store is None:
+        return align_closes(closes, tickers)
 
+    # end is exclusive, like in yfinance
+    data = store.read_panel(tickers, start, pd.Timestamp(end) - pd.Timedelta(days=1))
+    data.index.name = 'Date'
 
+    return data
@@ -0,0 +1,79 @@
+# Copyright (c) 2025 Niroojane Selvam
+# Licensed under the MIT License. See LICENSE file in the project root for full license information.
+
+
+#!/usr/bin/env python
+# coding: utf-8
+
+import os
+import glob
+import json
+import datetime
+import threading
+import pandas as pd
+
+
+DEFAULT_LEDGER_ROOT=os.path.join('data','trades')
+
+
+class TradeLedger:
+
+    """
+    Local ledger of account trades synced from Binance.
+
+    New trades are appended as Parquet part files under ``<root>`` and the
+    last trade id seen per symbol is kept in ``<root>/cursors.json``, so a
+    sync only asks the exchange for trades after that id.
+    """
+
+    def __init__(self,root=DEFAULT_LEDGER_ROOT):
+
+        self.root=root
+        self._lock=threading.Lock()
+
+    def cursors(self):
+
+        path=os.path.join(self.root,'cursors.json')
+
+        if not os.path.exists(path):
+            return {}
+
+        with open(path) as f:
+            return json.load(f)
+
+    def append(self,trades):
+
+        if trades is None or trades.empty:
+            return
+
+        with self._lock:
+
+            os.makedirs(self.root,exist_ok=True)
+
+            stamp=datetime.datetime.now(datetime.timezone.utc).strftime('%Y%m%dT%H%M%S%f')
+            trades.reset_index(drop=True).to_parquet(os.path.join(self.root,f'part-{stamp}.parquet'))
+
+            # Cursors move only once the trades they point to are on disk
+            cursors=self.cursors()
+            for symbol,last_id in trades.groupby('symbol')['id'].max().items():
+                cursors[symbol]=max(int(last_id),cursors.get(symbol,-1))
+
+            path=os.path.join(self.root,'cursors.json')
+            with open(path+'.tmp','w') as f:
+                json.dump(cursors,f)
+            os.replace(path+'.tmp',path)
+
+    def read(self,symbols=None):
+
+        parts=sorted(glob.glob(os.path.join(self.root,'part-*.parquet')))
+
+        if not parts:
+            return pd.DataFrame()
+
+        history=pd.concat([pd.read_parquet(part) for part in parts],ignore_index=True)
+        history=history.drop_duplicates(subset=['symbol','id'],keep='last')
+
+        if symbols is not None:
+            history=history[history['symbol'].isin(symbols)]
+
+        return history.sort_values(by=['time','id']).reset_index(drop=True)
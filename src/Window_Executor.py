@@ -0,0 +1,67 @@
+# Copyright (c) 2025 Niroojane Selvam
+# Licensed under the MIT License. See LICENSE file in the project root for full license information.
+
+
+#!/usr/bin/env python
+# coding: utf-8
+
+# Runs the rolling window functions of RiskMetrics on a joblib pool, a chunk of
+# windows per task. Set once per process, e.g. on a 32 core box:
+#     from src import Window_Executor
+#     Window_Executor.configure(n_jobs=32,chunks_per_worker=2)
+
+import numpy as np
+from joblib import Parallel, delayed, effective_n_jobs
+
+
+EXECUTION={
+    # Workers used when a function is called with n_jobs=None, -1 is every core
+    'n_jobs':-1,
+    'backend':'loky',
+    # Tasks per worker, more than one evens out windows of unequal cost
+    'chunks_per_worker':4,
+    # Arrays larger than this are dumped once to a memory mapped file the workers
+    # open read-only, instead of being pickled with every task
+    'max_nbytes':'1M',
+    'mmap_mode':'r',
+    # None lets joblib pick (/dev/shm when it has room)
+    'temp_folder':None,
+}
+
+
+def configure(**options):
+
+    unknown=set(options)-set(EXECUTION)
+
+    if unknown:
+        raise ValueError(f"Unknown execution options {sorted(unknown)}, expected some of {list(EXECUTION)}")
+
+    EXECUTION.update(options)
+
+    return dict(EXECUTION)
+
+
+def map_windows(function,starts,*arrays,n_jobs=None,**kwargs):
+
+    # [function(chunk, *arrays, **kwargs) for chunk of starts] flattened, in the order of starts.
+    # function must be defined at module level and return one result per start of its chunk;
+    # the arrays reach the workers memory mapped, so pass numpy arrays rather than frames.
+
+    starts=np.asarray(starts)
+    n_jobs=EXECUTION['n_jobs'] if n_jobs is None else n_jobs
+    workers=effective_n_jobs(n_jobs)
+
+    if workers==1 or len(starts)<2:
+        return list(function(starts,*arrays,**kwargs))
+
+    chunks=np.array_split(starts,min(len(starts),workers*EXECUTION['chunks_per_worker']))
+
+    results=Parallel(
+        n_jobs=workers,
+        backend=EXECUTION['backend'],
+        max_nbytes=EXECUTION['max_nbytes'],
+        mmap_mode=EXECUTION['mmap_mode'],
+        temp_folder=EXECUTION['temp_folder'],
+    )(delayed(function)(chunk,*arrays,**kwargs) for chunk in chunks)
+
+    return [result for chunk in results for result in chunk]
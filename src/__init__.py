@@ -1,22 +1,35 @@
 # Expose key classes and functions at package level
 
 from .Binance_API import BinanceAPI
+from .Price_Store import PriceStore
+from .Minute_Store import MinuteBarStore
+from .Trade_Ledger import TradeLedger
+from .Snapshot_Store import SnapshotStore
 from .PnL_Computation import PnL
 from .Stock_Data import get_close
+from .Price_Panel import PanelBuilder, PricePanel
 
 # Optional: expose modules (cleaner than import *)
 from .Git import GitHub
 from . import RiskMetrics
+from . import Window_Executor
 from . import Rebalancing
 from . import Metrics
 
 # Define what gets imported with: from src import *
 __all__ = [
     "BinanceAPI",
+    "PriceStore",
+    "MinuteBarStore",
+    "TradeLedger",
+    "SnapshotStore",
     "PnL",
     "get_close",
+    "PanelBuilder",
+    "PricePanel",
     "GitHub",
     "RiskMetrics",
+    "Window_Executor",
     "Rebalancing",
     "Metrics",
 ]
\ No newline at end of file
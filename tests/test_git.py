@@ -0,0 +1,165 @@
+import json
+import base64
+import hashlib
+import threading
+import unittest
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from src.Git import GitHub, blob_sha
+
+
+class FakeGitHub(BaseHTTPRequestHandler):
+
+    # Stand-in for the git data endpoints of the GitHub API used by publish_files
+
+    def log_message(self, *args):
+        pass
+
+    def _send(self, status, payload):
+
+        body = json.dumps(payload).encode()
+
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _route(self):
+
+        # /repos/<owner>/<repo>/git/... -> ['git', ...]
+        return self.path.split('?')[0].split('/')[4:]
+
+    def _body(self):
+
+        return json.loads(self.rfile.read(int(self.headers['Content-Length'])))
+
+    def do_GET(self):
+
+        state = self.server.state
+        state['calls'].append(('GET', self.path))
+        route = self._route()
+
+        if route[:3] == ['git', 'ref', 'heads']:
+            return self._send(200, {'object': {'sha': state['refs'][route[3]]}})
+        if route[:2] == ['git', 'commits']:
+            return self._send(200, {'tree': {'sha': state['commits'][route[2]]}})
+        if route[:2] == ['git', 'trees']:
+            tree = state['trees'][route[2]]
+            return self._send(200, {'tree': [{'path': path, 'type': 'blob', 'sha': sha} for path, sha in tree.items()]})
+
+        self._send(404, {'message': 'Not Found'})
+
+    def do_POST(self):
+
+        state = self.server.state
+        state['calls'].append(('POST', self.path))
+        route, body = self._route(), self._body()
+
+        if route == ['git', 'blobs']:
+            content = base64.b64decode(body['content'])
+            return self._send(201, {'sha': blob_sha(content)})
+
+        if route == ['git', 'trees']:
+            tree = dict(state['trees'][body['base_tree']])
+            tree.update({entry['path']: entry['sha'] for entry in body['tree']})
+            sha = hashlib.sha1(json.dumps(tree, sort_keys=True).encode()).hexdigest()
+            state['trees'][sha] = tree
+            return self._send(201, {'sha': sha})
+
+        if route == ['git', 'commits']:
+            sha = hashlib.sha1(json.dumps(body, sort_keys=True).encode()).hexdigest()
+            state['commits'][sha] = body['tree']
+            return self._send(201, {'sha': sha})
+
+        self._send(404, {'message': 'Not Found'})
+
+    def do_PATCH(self):
+
+        state = self.server.state
+        state['calls'].append(('PATCH', self.path))
+        route, body = self._route(), self._body()
+
+        if state['reject_ref_update']:
+            return self._send(422, {'message': 'Update is not a fast forward'})
+
+        state['refs'][route[3]] = body['sha']
+        self._send(200, {'object': {'sha': body['sha']}})
+
+
+class PublishFilesTest(unittest.TestCase):
+
+    def setUp(self):
+
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), FakeGitHub)
+        self.server.state = {
+            'refs': {'main': 'c0'},
+            'commits': {'c0': 't0'},
+            'trees': {'t0': {'README.md': blob_sha(b'readme')}},
+            'calls': [],
+            'reject_ref_update': False,
+        }
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+
+        self.github = GitHub('token', 'owner', 'repo', 'main', api_url=f'http://127.0.0.1:{self.server.server_port}')
+
+    def tearDown(self):
+
+        self.server.shutdown()
+        self.server.server_close()
+
+    def writes(self):
+
+        return [(method, path.split('/', 4)[-1]) for method, path in self.server.state['calls'] if method != 'GET']
+
+    def head_tree(self):
+
+        state = self.server.state
+        return state['trees'][state['commits'][state['refs']['main']]]
+
+    def test_files_are_pushed_in_one_commit(self):
+
+        files = {'Positions.xlsx': b'positions', 'Quantities.xlsx': b'quantities'}
+
+        commit_sha = self.github.publish_files(files, message='Update')
+
+        self.assertEqual(commit_sha, self.server.state['refs']['main'])
+        self.assertEqual(self.writes(), [
+            ('POST', 'git/blobs'),
+            ('POST', 'git/blobs'),
+            ('POST', 'git/trees'),
+            ('POST', 'git/commits'),
+            ('PATCH', 'git/refs/heads/main'),
+        ])
+        self.assertEqual(self.head_tree(), {
+            'README.md': blob_sha(b'readme'),
+            'Positions.xlsx': blob_sha(b'positions'),
+            'Quantities.xlsx': blob_sha(b'quantities'),
+        })
+
+    def test_unchanged_files_are_skipped(self):
+
+        files = {'Positions.xlsx': b'positions', 'Quantities.xlsx': b'quantities'}
+        first_sha = self.github.publish_files(files)
+        self.server.state['calls'].clear()
+
+        # Nothing changed: no write at all and the current head is returned
+        self.assertEqual(self.github.publish_files(files), first_sha)
+        self.assertEqual(self.writes(), [])
+
+        # Only the changed file is uploaded
+        self.github.publish_files({**files, 'Quantities.xlsx': b'new quantities'})
+        self.assertEqual(self.writes().count(('POST', 'git/blobs')), 1)
+        self.assertEqual(self.head_tree()['Quantities.xlsx'], blob_sha(b'new quantities'))
+        self.assertEqual(self.head_tree()['Positions.xlsx'], blob_sha(b'positions'))
+
+    def test_rejected_ref_update_returns_none(self):
+
+        self.server.state['reject_ref_update'] = True
+
+        self.assertIsNone(self.github.publish_files({'Positions.xlsx': b'positions'}))
+        self.assertEqual(self.server.state['refs']['main'], 'c0')
+
+
+if __name__ == '__main__':
+    unittest.main()